@@ -0,0 +1,98 @@
+"""
+Checks and benchmarks the embedding backends used by extract_experience.
+
+Embeds the turns of a synthetic transcript and the default prompt bank with each backend
+("torch", "onnx", "onnx-int8"), then compares every backend's per-sentence similarity scores
+with the torch scores:
+
+- max_abs_diff must stay within --tolerance, and
+- every sentence whose torch score is further than --tolerance from --threshold must be
+  selected (or dropped) exactly as torch does, so the 0.4 threshold keeps picking the same
+  sentences.
+
+Exits with status 1 if a backend fails either check, so it can gate a backend or model change.
+Also reports encode throughput and the speedup over torch at the configured EMBEDDING_THREADS
+and EMBEDDING_BATCH_SIZE.
+
+Usage: python benchmarks/bench_embedding_backends.py [--turns 400] [--backends torch onnx onnx-int8]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import config  # noqa: E402
+from format_transcript import format_transcript  # noqa: E402
+from harness import synthetic_transcript  # noqa: E402
+from model_registry import configure_threads, encode, get_model  # noqa: E402
+from prompt_index import load_prompt_bank  # noqa: E402
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scores_for(sentences, prompts, backend: str) -> np.ndarray:
+    sentence_embeddings = encode(sentences, backend=backend, use_cache=False)
+    prompt_embeddings = encode(prompts, backend=backend, use_cache=False)
+    return (sentence_embeddings @ prompt_embeddings.T).max(axis=1)
+
+
+def run(turns: int, backends, threshold: float, tolerance: float, repeat: int) -> bool:
+    configure_threads()
+    sentences = [turn["content"] for turn in format_transcript(synthetic_transcript(turns))]
+    prompts = load_prompt_bank()
+
+    reference = scores_for(sentences, prompts, "torch")
+    reference_selected = reference > threshold
+    # Sentences this close to the threshold may legitimately flip between backends
+    decisive = np.abs(reference - threshold) > tolerance
+
+    torch_s = None
+    passed = True
+    for backend in backends:
+        get_model(backend=backend)  # load (and export) outside the timed region
+        scores = scores_for(sentences, prompts, backend)
+        selected = scores > threshold
+        row = {
+            "backend": backend,
+            "sentences": len(sentences),
+            "threads": config.EMBEDDING_THREADS or "auto",
+            "batch_size": config.EMBEDDING_BATCH_SIZE,
+            "encode_s": best_of(lambda: encode(sentences, backend=backend, use_cache=False), repeat),
+            "max_abs_diff": float(np.abs(scores - reference).max()),
+            "selection_changes": int((selected != reference_selected).sum()),
+            "decisive_selection_changes": int((selected != reference_selected)[decisive].sum()),
+        }
+        row["sentences_per_s"] = round(len(sentences) / row["encode_s"], 1)
+        if backend == "torch":
+            torch_s = row["encode_s"]
+        if torch_s:
+            row["speedup"] = round(torch_s / row["encode_s"], 2)
+        row["ok"] = row["max_abs_diff"] <= tolerance and row["decisive_selection_changes"] == 0
+        passed = passed and row["ok"]
+        print(json.dumps(row))
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--tolerance", type=float, default=0.03)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.turns, args.backends, args.threshold, args.tolerance, args.repeat) else 1)
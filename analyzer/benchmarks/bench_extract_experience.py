@@ -0,0 +1,85 @@
+"""
+Benchmarks the thresholding and context-window expansion in extract_experience.
+
+Compares the previous per-row Python loops with the vectorized `expand_matches` path on
+random similarity matrices of growing transcript length, and checks both select the same
+sentences. Pass --with-model to also time the full extract_experience call end to end.
+
+Usage: python benchmarks/bench_extract_experience.py [--sizes 100 1000 10000] [--with-model]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from experience_analyzer import expand_matches  # noqa: E402
+
+
+def legacy_select(similarity_matrix: np.ndarray, similarity_threshold: float, margin: int):
+    n = len(similarity_matrix)
+    matched_indices = [i for i in range(n) if max(similarity_matrix[i]) > similarity_threshold]
+    expanded_indices = set()
+    for idx in matched_indices:
+        for i in range(idx - margin, idx + margin + 1):
+            if 0 <= i < n:
+                expanded_indices.add(i)
+    return sorted(expanded_indices)
+
+
+def vectorized_select(similarity_matrix: np.ndarray, similarity_threshold: float, margin: int):
+    keep = expand_matches(similarity_matrix.max(axis=1) > similarity_threshold, margin)
+    return np.flatnonzero(keep).tolist()
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, n_prompts: int, margin: int, threshold: float, repeat: int, with_model: bool):
+    rng = np.random.default_rng(0)
+    results = []
+    for n in sizes:
+        # Similarities skewed so roughly 10% of rows cross the 0.4 threshold
+        sims = rng.beta(2, 5, size=(n, n_prompts)).astype(np.float32)
+
+        assert legacy_select(sims, threshold, margin) == vectorized_select(sims, threshold, margin)
+
+        row = {
+            "utterances": n,
+            "legacy_s": best_of(lambda: legacy_select(sims, threshold, margin), repeat),
+            "vectorized_s": best_of(lambda: vectorized_select(sims, threshold, margin), repeat),
+        }
+        row["speedup"] = round(row["legacy_s"] / row["vectorized_s"], 1)
+
+        if with_model:
+            from experience_analyzer import extract_experience
+            transcript = [{"user": "Candidate", "content": f"I worked at company {i} on project {i % 17}."}
+                          for i in range(n)]
+            extract_experience(transcript[:8])  # warm up model and prompt index
+            row["extract_experience_s"] = best_of(lambda: extract_experience(transcript), 1)
+
+        results.append(row)
+        print(json.dumps(row))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 50_000])
+    parser.add_argument("--prompts", type=int, default=30)
+    parser.add_argument("--margin", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--with-model", action="store_true")
+    args = parser.parse_args()
+    run(args.sizes, args.prompts, args.margin, args.threshold, args.repeat, args.with_model)
@@ -0,0 +1,83 @@
+"""
+Regression and throughput benchmark for format_transcript.
+
+Generates synthetic transcripts of growing size, checks the streaming parser returns exactly
+what the original backtracking regex returned, and reports throughput for both, plus the
+parser fed in small chunks as it would be from a network stream.
+
+Usage: python benchmarks/bench_format_transcript.py [--turns 10 100 1000] [--turn-words 200]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_transcript import format_transcript, iter_turns  # noqa: E402
+
+LEGACY_PATTERN = re.compile(r"([\w\s]+) \(\d{2}/\d{2}/\d{4}, \d{2}:\d{2} [APM]{2}\): (.*?)(?=(?: [\w\s]+ \(\d{2}/\d{2}/\d{4}, \d{2}:\d{2} [APM]{2}\):)|$)", re.DOTALL)
+
+WORDS = ("I worked on the backend services and we migrated our data pipeline to the cloud "
+         "which was honestly a big project for the team so I learned a lot about scaling").split()
+
+
+def legacy_format_transcript(transcript: str):
+    return [{"user": user.strip(), "content": content.strip()} for user, content in LEGACY_PATTERN.findall(transcript)]
+
+
+def synthetic_transcript(turns: int, turn_words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    speakers = ["Manish Bulchandani", "Rohit Sharma"]
+    parts = []
+    for i in range(turns):
+        minute = i % 60
+        words = " ".join(rng.choice(WORDS) for _ in range(turn_words))
+        parts.append(f"{speakers[i % 2]} (02/28/2025, 03:{minute:02d} AM): {words.capitalize()}.")
+    return "  ".join(parts)
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def chunked(text: str, size: int):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+def run(turn_counts, turn_words: int, chunk_size: int, repeat: int):
+    for turns in turn_counts:
+        text = synthetic_transcript(turns, turn_words)
+        expected = legacy_format_transcript(text)
+        assert format_transcript(text) == expected, "parser output differs from the legacy regex"
+        assert list(iter_turns(chunked(text, chunk_size))) == expected, "chunked parse differs from the legacy regex"
+
+        megabytes = len(text.encode("utf-8")) / 1e6
+        legacy_s = timed(lambda: legacy_format_transcript(text), repeat)
+        parser_s = timed(lambda: format_transcript(text), repeat)
+        chunked_s = timed(lambda: list(iter_turns(chunked(text, chunk_size))), repeat)
+        print(json.dumps({
+            "turns": turns,
+            "megabytes": round(megabytes, 3),
+            "legacy_mb_per_s": round(megabytes / legacy_s, 2),
+            "parser_mb_per_s": round(megabytes / parser_s, 2),
+            "chunked_parser_mb_per_s": round(megabytes / chunked_s, 2),
+        }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1_000, 5_000])
+    parser.add_argument("--turn-words", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.turns, args.turn_words, args.chunk_size, args.repeat)
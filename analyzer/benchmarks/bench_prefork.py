@@ -0,0 +1,126 @@
+"""
+Measures the pre-fork deployment (gunicorn.conf.py) at several worker counts.
+
+For each --workers value, starts gunicorn against a local Groq stub, warms the workers up with
+concurrent requests, then reports each process's RSS and PSS (proportional set size: pages
+shared between processes are split between them, from /proc/<pid>/smaps_rollup). Total PSS is
+the memory the deployment really uses; total RSS is roughly what the same workers would use
+without sharing the preloaded model. A harness load test (see harness.run_load) then measures
+latency and throughput at that worker count.
+
+Linux only (smaps_rollup). Extra environment, e.g. EMBEDDING_MODEL_NAME or LANGUAGETOOL_URL,
+is passed on to gunicorn.
+
+Usage: python benchmarks/bench_prefork.py [--workers 1 2 4] [--concurrency 8] [--requests 64]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYZER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ANALYZER_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from groq_stub_server import start_stub_server  # noqa: E402
+from harness import CANDIDATE, run_load, synthetic_transcript  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                fields[name.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 1)
+    return fields
+
+
+def child_pids(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def warm_up(url: str, workers: int, timeout: float):
+    """Waits for the server, then sends concurrent analyses so each worker loads what it loads lazily."""
+    body = synthetic_transcript(20).encode("utf-8")
+    params = {"job_description": "Backend engineer", "candidate": CANDIDATE}
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=url, timeout=timeout) as client:
+        while True:
+            try:
+                client.post("/analysis", content=body, params=params)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+    with ThreadPoolExecutor(max_workers=4 * workers) as executor:
+        list(executor.map(lambda _: httpx.post(f"{url}/analysis", content=body, params=params, timeout=timeout),
+                          range(4 * workers)))
+
+
+def run(workers: int, args, groq_url: str) -> Dict:
+    port = free_port()
+    env = dict(os.environ, WORKERS=str(workers), BIND=f"127.0.0.1:{port}", GROQ_BASE_URL=groq_url,
+               LLM_CACHE_ENABLED="false", EMBEDDING_CACHE_ENABLED="false", JOB_WORKERS="0")
+    env.setdefault("GROQ_API_KEY", "stub-key")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], cwd=ANALYZER_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.perf_counter()
+        warm_up(url, workers, args.timeout)
+        row = {"workers": workers, "ready_s": round(time.perf_counter() - started, 1)}
+
+        parent = memory_mb(server.pid)
+        children = [memory_mb(pid) for pid in child_pids(server.pid)]
+        row["parent"] = parent
+        row["worker_rss_mb"] = [child["rss_mb"] for child in children]
+        row["worker_pss_mb"] = [child["pss_mb"] for child in children]
+        row["total_rss_mb"] = round(parent["rss_mb"] + sum(row["worker_rss_mb"]), 1)
+        row["total_pss_mb"] = round(parent["pss_mb"] + sum(row["worker_pss_mb"]), 1)
+        row["shared_saving_mb"] = round(row["total_rss_mb"] - row["total_pss_mb"], 1)
+
+        load = asyncio.run(run_load(url, args.load_turns, [args.concurrency], args.requests, args.timeout))[0]
+        row["latency"] = load["latency"]
+        row["throughput_rps"] = load["throughput_rps"]
+        row["errors"] = load["errors"]
+        return row
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--load-turns", type=int, default=40, help="Transcript size used for the load test")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Seconds the Groq stub waits before answering")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--verbose", action="store_true", help="Show gunicorn's log")
+    args = parser.parse_args()
+
+    stub = start_stub_server(delay=args.llm_delay)
+    groq_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    print(json.dumps({"cpu_count": os.cpu_count()}))
+    for workers in args.workers:
+        print(json.dumps(run(workers, args, groq_url)))
+    stub.shutdown()
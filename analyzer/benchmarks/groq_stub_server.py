@@ -0,0 +1,130 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers any POST to .../chat/completions with an OpenAI-style completion holding a canned
+experience evaluation, after a configurable delay. A fraction of requests can be failed with
+429 or 503 (with a Retry-After header) to exercise the client's retry and backoff. Point the analyzer at it with
+GROQ_BASE_URL=http://127.0.0.1:<port> (any non-empty GROQ_API_KEY works).
+
+Usage: python benchmarks/groq_stub_server.py [--port 8765] [--delay 0.5] [--error-rate 0.1]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_ANALYSIS = {
+    "experience_match": 75,
+    "key_strengths": ["Python", "Machine Learning"],
+    "missing_skills": ["Cloud deployment"],
+    "complexity_handled": 7,
+    "overall_fit_score": 70
+}
+
+
+class StubState:
+    def __init__(self, delay: float = 0.0, error_rate: float = 0.0, error_status: int = 429, retry_after: float = 0.0):
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+
+class GroqStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        state = self.state
+        with state.lock:
+            state.requests += 1
+            fail = random.random() < state.error_rate
+            if fail:
+                state.errors += 1
+
+        time.sleep(state.delay)
+        if fail:
+            self._send_json(state.error_status, {"error": {"message": "Stubbed failure", "type": "stub_error"}},
+                            headers={"Retry-After": f"{state.retry_after:g}"})
+            return
+
+        content = json.dumps(CANNED_ANALYSIS)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        self._send_json(200, {
+            "id": f"chatcmpl-stub-{state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content.split()),
+                "total_tokens": prompt_tokens + len(content.split())
+            }
+        })
+
+
+def start_stub_server(port: int = 0, delay: float = 0.0, error_rate: float = 0.0,
+                      error_status: int = 429, retry_after: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Starts the stub server on a background thread.
+
+    :param port: Port to listen on; 0 picks a free port (see server.server_address).
+    :param delay: Seconds to wait before answering each request.
+    :param error_rate: Fraction of requests answered with `error_status`.
+    :param error_status: HTTP status used for injected failures.
+    :param retry_after: Retry-After seconds sent with injected failures.
+    :return: The running server; call shutdown() to stop it.
+    """
+    state = StubState(delay, error_rate, error_status, retry_after)
+    handler = type("Handler", (GroqStubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.delay, args.error_rate, args.error_status, args.retry_after)
+    print(f"Groq stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,261 @@
+"""
+Benchmark and load-test harness for the analyzer pipeline.
+
+Generates synthetic "Name (MM/DD/YYYY, HH:MM AM): text" transcripts, times each pipeline stage
+(format_transcript, extract_experience, analyze_transcript_sentiment) at several transcript
+sizes, then runs concurrent load against the FastAPI app with the Groq API replaced by a local
+stub that answers after a configurable delay. Results (p50/p95/p99 latency, throughput and
+peak RSS) are written as JSON so runs can be compared.
+
+Usage:
+    python benchmarks/harness.py --sizes 20 200 2000 --concurrency 1 8 32 --requests 64 \\
+        --llm-delay 0.5 --output bench_output.json
+
+Pass --url http://host:8000 to load-test a running server instead of the in-process app
+(the server must then be configured with GROQ_BASE_URL pointing at a stub itself).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+INTERVIEWER = "Manish Bulchandani"
+CANDIDATE = "Rohit Sharma"
+
+QUESTIONS = [
+    "Can you start by telling me a little about yourself?",
+    "Can you tell me about a project you've worked on that you're particularly proud of?",
+    "How do you handle disagreements within your team?",
+    "What was the most difficult bug you have fixed?",
+    "Why are you interested in this role?",
+]
+EXPERIENCE = [
+    "I have {n} years of experience in Python and distributed systems.",
+    "Previously, I worked at a fintech startup as a backend engineer.",
+    "I was responsible for migrating our services to AWS.",
+    "I lead a team of {n} engineers building data pipelines.",
+    "I did an internship at a cloud company where I worked on Kubernetes tooling.",
+]
+SMALL_TALK = [
+    "So, um, that was a really interesting challenge for us.",
+    "I think communication is actually the most important part, you know.",
+    "We basically set up regular check-ins to monitor progress.",
+    "Honestly I enjoyed it a lot and learned a great deal.",
+    "Right, so the team was receptive to the feedback.",
+]
+
+
+def synthetic_transcript(turns: int, sentences_per_answer: int = 4, seed: int = 0) -> str:
+    """
+    Builds a transcript alternating interviewer questions and candidate answers.
+
+    :param turns: Number of speaker turns.
+    :param sentences_per_answer: Sentences in each candidate answer.
+    :param seed: Random seed, so runs are comparable.
+    :return: Raw transcript text.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(turns):
+        hour, minute = divmod(i, 60)
+        timestamp = f"02/28/2025, {(hour % 12) + 1:02d}:{minute:02d} AM"
+        if i % 2 == 0:
+            parts.append(f"{INTERVIEWER} ({timestamp}): {rng.choice(QUESTIONS)}")
+        else:
+            sentences = [rng.choice(EXPERIENCE if rng.random() < 0.3 else SMALL_TALK).format(n=rng.randint(2, 9))
+                         for _ in range(sentences_per_answer)]
+            parts.append(f"{CANDIDATE} ({timestamp}): {' '.join(sentences)}")
+    return "  ".join(parts)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_s": round(percentile(values, 50), 4),
+        "p95_s": round(percentile(values, 95), 4),
+        "p99_s": round(percentile(values, 99), 4),
+        "mean_s": round(sum(values) / len(values), 4) if values else 0.0,
+        "max_s": round(values[-1], 4) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def time_stage(fn: Callable, repeat: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def run_stages(sizes: List[int], repeat: int, stages: List[str]) -> List[Dict]:
+    from format_transcript import format_transcript
+    from experience_analyzer import extract_experience
+    from sentiment_analyzer import analyze_transcript_sentiment
+
+    results = []
+    for turns in sizes:
+        text = synthetic_transcript(turns)
+        formatted = format_transcript(text)
+        row = {"turns": turns, "bytes": len(text.encode("utf-8")), "stages": {}}
+        if "format_transcript" in stages:
+            row["stages"]["format_transcript"] = time_stage(lambda: format_transcript(text), repeat)
+        if "extract_experience" in stages:
+            extract_experience(formatted[:4])  # warm up the model and prompt index
+            row["stages"]["extract_experience"] = time_stage(lambda: extract_experience(formatted), repeat)
+        if "analyze_sentiment" in stages:
+            row["stages"]["analyze_sentiment"] = time_stage(
+                lambda: analyze_transcript_sentiment(formatted, CANDIDATE), repeat)
+        row["peak_rss_mb"] = peak_rss_mb()
+        results.append(row)
+        print(json.dumps(row), file=sys.stderr)
+    return results
+
+
+async def run_load(url: str, turns: int, concurrency_levels: List[int], requests: int,
+                   timeout: float) -> List[Dict]:
+    import httpx
+
+    job_description = "Backend engineer with Python, AWS and distributed systems experience."
+    # Distinct transcripts per request so neither the LLM nor the grammar cache hides the real cost
+    bodies = [synthetic_transcript(turns, seed=i).encode("utf-8") for i in range(requests)]
+
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=timeout)
+        lifespan = None
+    else:
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://analyzer", timeout=timeout)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    results = []
+    try:
+        for concurrency in concurrency_levels:
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies, errors = [], 0
+
+            async def one(body: bytes):
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post("/analysis", content=body,
+                                                      params={"job_description": job_description,
+                                                              "candidate": CANDIDATE})
+                        if response.status_code != 200:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(body) for body in bodies))
+            elapsed = time.perf_counter() - start
+
+            row = {
+                "concurrency": concurrency,
+                "turns": turns,
+                "latency": latency_summary(latencies),
+                "errors": errors,
+                "throughput_rps": round(len(bodies) / elapsed, 3),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            results.append(row)
+            print(json.dumps(row), file=sys.stderr)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="Transcript sizes in turns")
+    parser.add_argument("--stages", nargs="+", default=["format_transcript", "extract_experience", "analyze_sentiment"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--load-turns", type=int, default=40, help="Transcript size used for the load test")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Seconds the Groq stub waits before answering")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--embedding-cache", action="store_true",
+                        help="Keep the utterance embedding cache enabled (repeated stage runs then mostly hit it)")
+    parser.add_argument("--url", help="Load-test a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--skip-stages", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # Configure the analyzer before it is imported: config is read from the environment once
+    os.environ["EMBEDDING_CACHE_ENABLED"] = "true" if args.embedding_cache else "false"
+    if not args.url:
+        from groq_stub_server import start_stub_server
+        stub = start_stub_server(delay=args.llm_delay, error_rate=args.llm_error_rate)
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}"
+        os.environ.setdefault("GROQ_API_KEY", "stub-key")
+        os.environ["LLM_CACHE_ENABLED"] = "true" if args.llm_cache else "false"
+        os.environ["JOB_WORKERS"] = "0"
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "stages": [],
+        "load": [],
+    }
+    if not args.skip_stages:
+        report["stages"] = run_stages(args.sizes, args.repeat, args.stages)
+    if not args.skip_load:
+        report["load"] = asyncio.run(run_load(args.url, args.load_turns, args.concurrency, args.requests, args.timeout))
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
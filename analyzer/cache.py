@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from metrics import REGISTRY
+
+
+class LRUCache:
+    def __init__(self, max_entries: int):
+        """
+        Thread-safe in-memory LRU mapping of cache keys to values (response text, embeddings, ...).
+
+        :param max_entries: Entries kept before the least recently used is dropped.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    # Expired and excess rows are cleaned up every this many writes
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, ttl: float, max_rows: int, table: str = "llm_cache"):
+        """
+        Persistent cache tier in a SQLite file, shared by every process pointing at it.
+
+        Values are stored as given, so a table can hold text or bytes.
+
+        :param path: Path of the SQLite database.
+        :param ttl: Seconds before an entry expires.
+        :param max_rows: Rows kept before the least recently used are evicted.
+        :param table: Table to keep the entries in, so several caches can share one file.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.table = table
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+
+    # Keys per SELECT, below SQLite's default limit of 999 bound parameters
+    BATCH_KEYS = 500
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Union[str, bytes]]:
+        """
+        Looks up several keys with one SELECT per BATCH_KEYS keys, and marks every hit as
+        accessed in a single transaction.
+
+        :return: Dict of key -> value for the keys that were found and have not expired.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), self.BATCH_KEYS):
+                batch = keys[start:start + self.BATCH_KEYS]
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({', '.join('?' * len(batch))}) AND created > ?",
+                    (*batch, now - self.ttl)
+                ).fetchall())
+            if found:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(f"UPDATE {self.table} SET accessed = ? WHERE key = ?",
+                                           ((now, key) for key in found))
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._conn.execute("COMMIT")
+        return found
+
+    def put(self, key: str, value: Union[str, bytes]):
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, Union[str, bytes]]]):
+        """Stores several entries in one transaction, so a batch costs a single commit."""
+        now = time.time()
+        rows = [(key, value, now, now) for key, value in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)", rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            previous, self._writes = self._writes, self._writes + len(rows)
+            if previous // self.EVICT_EVERY != self._writes // self.EVICT_EVERY:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute(f"DELETE FROM {self.table} WHERE created <= ?", (now - self.ttl,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_rows,)
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+def tiered_get_many(keys: Iterable[str], memory: LRUCache, disk: Optional[SQLiteCache], requests,
+                    decode: Callable[[Any], Any] = None) -> Dict[str, Any]:
+    """
+    Looks up each distinct key in a two-tier cache, memory tier first, then every memory miss in
+    one batched disk lookup. Disk hits are copied into the memory tier.
+
+    :param keys: Keys to look up.
+    :param memory: The in-memory tier.
+    :param disk: The persistent tier, or None.
+    :param requests: Request counter, incremented by tier ("memory", "disk") and result.
+    :param decode: Turns a stored disk value into the cached value, e.g. bytes into an array.
+    :return: Dict of key -> value for the keys that were found.
+    """
+    found, missing = {}, []
+    for key in dict.fromkeys(keys):
+        value = memory.get(key)
+        if value is not None:
+            found[key] = value
+        else:
+            missing.append(key)
+    requests.inc(len(found), tier="memory", result="hit")
+    requests.inc(len(missing), tier="memory", result="miss")
+
+    if disk is not None and missing:
+        values = disk.get_many(missing)
+        requests.inc(len(values), tier="disk", result="hit")
+        requests.inc(len(missing) - len(values), tier="disk", result="miss")
+        for key, value in values.items():
+            value = decode(value) if decode is not None else value
+            memory.put(key, value)
+            found[key] = value
+    return found
+
+
+def tier_stats(requests, memory: LRUCache) -> Dict[str, float]:
+    """
+    Hit and miss counts per tier of a two-tier cache, plus the overall hit ratio.
+
+    :param requests: The cache's request counter, labelled by tier ("memory", "disk") and result.
+    :param memory: The cache's in-memory tier.
+    :return: Dictionary of per-tier hits and misses, hit_ratio and memory_entries.
+    """
+    stats = {}
+    for tier in ("memory", "disk"):
+        stats[f"{tier}_hits"] = requests.value(tier=tier, result="hit")
+        stats[f"{tier}_misses"] = requests.value(tier=tier, result="miss")
+    lookups = stats["memory_hits"] + stats["memory_misses"]
+    stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+    stats["memory_entries"] = len(memory)
+    return stats
+
+
+def report_hit_ratio(gauge, get_cache: Callable[[], Any]):
+    """
+    Sets the gauge to the cache's hit ratio whenever metrics are collected.
+
+    :param gauge: Gauge to set.
+    :param get_cache: Returns the cache, or None while it has not been created.
+    """
+    def collect():
+        cache = get_cache()
+        if cache is not None:
+            gauge.set(cache.stats()["hit_ratio"])
+
+    REGISTRY.on_collect(collect)
@@ -0,0 +1,106 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_str(name: str, default: str = None) -> str:
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Sentence embedding model used by the experience analyzer
+EMBEDDING_MODEL_NAME = _env_str("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = _env_str("EMBEDDING_DEVICE")  # None lets sentence-transformers pick (cuda if available, else cpu)
+PRELOAD_MODELS = _env_bool("PRELOAD_MODELS", True)  # Load models at FastAPI startup instead of on first request
+EMBEDDING_BACKEND = _env_str("EMBEDDING_BACKEND", "torch")  # "torch", "onnx" or "onnx-int8" (ONNX Runtime, CPU only)
+EMBEDDING_THREADS = _env_int("EMBEDDING_THREADS", 0)  # Intra-op threads per process; 0 splits the cores evenly across WORKERS
+EMBEDDING_BATCH_SIZE = _env_int("EMBEDDING_BATCH_SIZE", 32)  # Sentences encoded per forward pass
+ONNX_MODEL_DIR = _env_str("ONNX_MODEL_DIR", os.path.join(os.path.dirname(__file__), ".cache", "onnx"))  # Exported ONNX models
+ONNX_QUANTIZATION = _env_str("ONNX_QUANTIZATION", "avx2")  # int8 config for onnx-int8: "avx2", "avx512", "avx512_vnni" or "arm64"
+
+# Utterance embedding cache (repeated interviewer questions are embedded once)
+EMBEDDING_CACHE_ENABLED = _env_bool("EMBEDDING_CACHE_ENABLED", True)
+EMBEDDING_CACHE_SIZE = _env_int("EMBEDDING_CACHE_SIZE", 20_000)  # Embeddings kept in the in-memory LRU tier (~1.5 KB each for MiniLM)
+EMBEDDING_CACHE_DB = _env_str("EMBEDDING_CACHE_DB")  # SQLite file for the persistent tier; unset keeps the cache in memory only
+EMBEDDING_CACHE_TTL = _env_float("EMBEDDING_CACHE_TTL", 30 * 24 * 3600)  # Seconds before a persisted embedding expires
+EMBEDDING_CACHE_MAX_ROWS = _env_int("EMBEDDING_CACHE_MAX_ROWS", 200_000)  # Least recently used rows beyond this are evicted
+
+# Precomputed prompt-bank embeddings
+PROMPT_BANK_DIR = _env_str("PROMPT_BANK_DIR", os.path.join(os.path.dirname(__file__), "prompt_banks"))
+PROMPT_INDEX_DIR = _env_str("PROMPT_INDEX_DIR", os.path.join(os.path.dirname(__file__), ".cache", "prompt_index"))
+
+# Request pipeline concurrency and timeouts
+ANALYSIS_WORKERS = _env_int("ANALYSIS_WORKERS", 4)  # Threads for CPU-bound stages (embedding, TextBlob, grammar)
+ANALYSIS_MAX_CONCURRENT = _env_int("ANALYSIS_MAX_CONCURRENT", 8)  # Analyses running at once
+ANALYSIS_MAX_PENDING = _env_int("ANALYSIS_MAX_PENDING", 32)  # Running + queued analyses before new ones get a 503
+EXTRACTION_TIMEOUT = _env_float("EXTRACTION_TIMEOUT", 60.0)  # Seconds
+LLM_TIMEOUT = _env_float("LLM_TIMEOUT", 60.0)
+SENTIMENT_TIMEOUT = _env_float("SENTIMENT_TIMEOUT", 120.0)
+BATCH_LLM_CONCURRENCY = _env_int("BATCH_LLM_CONCURRENCY", 4)  # LLM calls in flight per batch request
+LLM_REQUESTS_PER_MINUTE = _env_float("LLM_REQUESTS_PER_MINUTE", 0)  # 0 disables the rate limit
+
+# Groq LLM client
+GROQ_API_KEY = _env_str("GROQ_API_KEY")
+GROQ_MODEL = _env_str("GROQ_MODEL", "llama3-8b-8192")
+GROQ_BASE_URL = _env_str("GROQ_BASE_URL")  # Point at a local stub server for testing; None uses api.groq.com
+LLM_MAX_IN_FLIGHT = _env_int("LLM_MAX_IN_FLIGHT", 8)  # Concurrent Groq requests per process, sync and async callers combined
+LLM_MAX_RETRIES = _env_int("LLM_MAX_RETRIES", 3)  # Retries on 429 / 5xx / connection errors
+LLM_BACKOFF_BASE = _env_float("LLM_BACKOFF_BASE", 0.5)  # Seconds; doubled on each retry, with full jitter
+LLM_BACKOFF_MAX = _env_float("LLM_BACKOFF_MAX", 8.0)
+LLM_RETRY_AFTER_MAX = _env_float("LLM_RETRY_AFTER_MAX", 30.0)  # Longest Retry-After honoured; a longer one fails the call
+LLM_HTTP_MAX_CONNECTIONS = _env_int("LLM_HTTP_MAX_CONNECTIONS", 16)
+LLM_SCHEMA_ATTEMPTS = _env_int("LLM_SCHEMA_ATTEMPTS", 2)  # Calls per structured request before giving up on an invalid reply
+
+# LLM response cache
+LLM_CACHE_ENABLED = _env_bool("LLM_CACHE_ENABLED", True)
+LLM_CACHE_SIZE = _env_int("LLM_CACHE_SIZE", 1024)  # Entries kept in the in-memory LRU tier
+LLM_CACHE_DB = _env_str("LLM_CACHE_DB")  # SQLite file for the persistent tier; unset keeps the cache in memory only
+LLM_CACHE_TTL = _env_float("LLM_CACHE_TTL", 7 * 24 * 3600)  # Seconds before an entry expires
+LLM_CACHE_MAX_ROWS = _env_int("LLM_CACHE_MAX_ROWS", 50_000)  # Least recently used rows beyond this are evicted
+LLM_FORCE_DETERMINISTIC = _env_bool("LLM_FORCE_DETERMINISTIC", False)  # Use temperature 0 so cached results are reproducible
+
+# Grammar checking (LanguageTool)
+LANGUAGETOOL_URL = _env_str("LANGUAGETOOL_URL")  # Shared LanguageTool server; unset starts a local one on first use
+LANGUAGETOOL_LANGUAGE = _env_str("LANGUAGETOOL_LANGUAGE", "en-US")
+GRAMMAR_CHECK_WORKERS = _env_int("GRAMMAR_CHECK_WORKERS", 4)  # Chunks checked in parallel
+GRAMMAR_CACHE_SIZE = _env_int("GRAMMAR_CACHE_SIZE", 10_000)  # Checked chunks remembered
+
+# Live interview sessions
+SESSION_TTL = _env_float("SESSION_TTL", 4 * 3600)  # Seconds of inactivity before a live session is dropped
+MAX_SESSIONS = _env_int("MAX_SESSIONS", 256)
+
+# Background analysis jobs
+JOB_DB = _env_str("JOB_DB", os.path.join(os.path.dirname(__file__), ".cache", "jobs.db"))
+JOB_WORKERS = _env_int("JOB_WORKERS", 2)  # Jobs processed at once per process
+JOB_LEASE = _env_float("JOB_LEASE", 600.0)  # Seconds without a lease renewal (the worker died) before another worker picks a running job up
+JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+JOB_RESULT_TTL = _env_float("JOB_RESULT_TTL", 30 * 24 * 3600)  # Seconds finished jobs are kept
+JOB_CALLBACK_TIMEOUT = _env_float("JOB_CALLBACK_TIMEOUT", 10.0)
+
+# Prompt assembly
+PROMPT_TOKEN_BUDGET = _env_int("PROMPT_TOKEN_BUDGET", 1500)  # Tokens of candidate experience sent to the LLM; 0 disables packing
+PROMPT_DEDUPE_THRESHOLD = _env_float("PROMPT_DEDUPE_THRESHOLD", 0.92)  # Cosine similarity above which sentences count as duplicates
+LLM_MAX_TOKENS = _env_int("LLM_MAX_TOKENS", 512)  # Tokens allowed in the LLM's reply
+PROMPT_TOKENIZER = _env_str("PROMPT_TOKENIZER", "cl100k_base")  # tiktoken encoding; falls back to the embedding model's tokenizer
+
+# Multi-process serving (gunicorn.conf.py)
+WORKERS = _env_int("WORKERS", 0)  # Worker processes forked from the parent that holds the models; 0 is one per core. Live sessions need 1
+BIND = _env_str("BIND", "0.0.0.0:8000")
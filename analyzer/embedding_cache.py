@@ -0,0 +1,92 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+from cache import LRUCache, SQLiteCache, report_hit_ratio, tier_stats, tiered_get_many
+from metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter("analyzer_embedding_cache_requests_total",
+                                  "Utterance embedding lookups by tier and result.")
+CACHE_HIT_RATIO = REGISTRY.gauge("analyzer_embedding_cache_hit_ratio",
+                                 "Share of utterances whose embedding was not computed again.")
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so the same utterance typed or transcribed slightly differently shares an entry."""
+    return " ".join(text.split())
+
+
+def embedding_key(model_name: str, backend: str, text: str) -> str:
+    """
+    Content address of an utterance embedding: model, backend and normalized text.
+
+    :return: Hex SHA-256 digest.
+    """
+    payload = json.dumps([model_name, backend, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, db_path: str = None):
+        """
+        Two-tier utterance embedding cache: an in-memory LRU in front of an optional SQLite file.
+
+        :param max_entries: Embeddings in the in-memory tier.
+        :param db_path: SQLite file for the persistent tier, or None to disable it. It may be the
+            same file as LLM_CACHE_DB; entries live in their own table.
+        """
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteCache(db_path, config.EMBEDDING_CACHE_TTL, config.EMBEDDING_CACHE_MAX_ROWS,
+                                table="embedding_cache") if db_path else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Looks up each distinct key, memory tier first.
+
+        :return: Dict of key -> embedding for the keys that were found.
+        """
+        # Every memory miss goes to the disk tier in one batched query
+        return tiered_get_many(keys, self.memory, self.disk, CACHE_REQUESTS,
+                               decode=lambda value: np.frombuffer(value, dtype=np.float32))
+
+    def put_many(self, embeddings: Dict[str, np.ndarray]):
+        for key, embedding in embeddings.items():
+            # Cached arrays are shared between callers, so they must never be written to
+            embedding = np.array(embedding, dtype=np.float32)
+            embedding.flags.writeable = False
+            self.memory.put(key, embedding)
+        if self.disk is not None:
+            self.disk.put_many((key, np.asarray(embedding, dtype=np.float32).tobytes())
+                               for key, embedding in embeddings.items())
+
+    def record_repeats(self, count: int):
+        """Counts utterances repeated within one encode call, which are embedded only once, as hits."""
+        if count:
+            CACHE_REQUESTS.inc(count, tier="memory", result="hit")
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counts per tier, plus the overall hit ratio."""
+        return tier_stats(CACHE_REQUESTS, self.memory)
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+report_hit_ratio(CACHE_HIT_RATIO, lambda: _cache)
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Returns the process-wide embedding cache, or None when EMBEDDING_CACHE_ENABLED is off."""
+    global _cache
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(config.EMBEDDING_CACHE_SIZE, config.EMBEDDING_CACHE_DB)
+    return _cache
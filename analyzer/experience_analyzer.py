@@ -1,67 +1,138 @@
-from sentence_transformers import SentenceTransformer, util
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import json
-import re
+import numpy as np
+from pydantic import BaseModel, Field
 # from groq_client import GroqClient
-from groq_langchain_client import LangChainGroqClient
+from groq_langchain_client import get_client, StructuredOutputError
+from model_registry import encode
+from prompt_index import get_prompt_embeddings
+from prompt_builder import pack_experience, pack_stats
+from tracing import span
+import config
 
-def extract_experience(transcript: List[Dict[str, str]], similarity_threshold: float = 0.4, margin: int = 1) -> List[str]:
+EXPERIENCE_SYSTEM_PROMPT = "You are an experienced technical recruiter evaluating candidates against job descriptions."
+
+
+class ExperienceAnalysis(BaseModel):
+    """Structured fitment metrics returned by the LLM."""
+    experience_match: float = Field(ge=0, le=100)
+    key_strengths: List[str]
+    missing_skills: List[str]
+    complexity_handled: float = Field(ge=0, le=10)
+    overall_fit_score: float = Field(ge=0, le=100)
+
+
+def extract_experience(transcript: List[Dict[str, str]], similarity_threshold: float = 0.4, margin: int = 1,
+                       role: str = None, token_budget: int = None, with_stats: bool = False):
     """
     Extracts relevant experience details from a formatted transcript.
+
+    The matched sentences are packed for the LLM prompt: near-duplicates are dropped and the most
+    relevant sentences are kept within the token budget (see prompt_builder.pack_experience).
     
     :param transcript: List of formatted transcript objects [{"user": "Name", "content": "Message"}]
     :param similarity_threshold: Cosine similarity threshold to consider a match
     :param margin: Number of adjacent sentences to include for context
-    :return: List of extracted experience-related sentences
+    :param role: Prompt bank to match against (see prompt_index), or None for the default bank
+    :param token_budget: Maximum tokens of extracted text. Defaults to PROMPT_TOKEN_BUDGET; 0 disables the budget
+    :param with_stats: Also return the packing stats (tokens sent and saved, see pack_experience)
+    :return: List of extracted experience-related sentences, or a (sentences, stats) tuple with with_stats
     """
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    
-    experience_prompts = [
-        "I worked at", "I have experience in", "Previously, I was at", "Before that, I worked at", 
-        "My previous company was", "I have been working as", "My last role was at", "I was employed at",
-        "I started my career at", "Currently, I am working at",
-        "I was responsible for", "My role involved", "I have been handling", "My work includes", 
-        "I specialize in", "I contribute to", "I manage", "I lead a team for", "I developed",
-        "I did an internship at", "I was an intern at", "I worked as a freelancer for", 
-        "I contributed to a project at", "I was a consultant for", "I had a contract role at",
-        "I have X years of experience in", "With X years of experience in", 
-        "For the past X years, I have worked on", "Over the last X years, I have been involved in", 
-        "I bring X years of experience in"
-    ]
-    
     sentences = [entry['content'] for entry in transcript]
-    response_embeddings = model.encode(sentences, convert_to_tensor=True)
-    prompt_embeddings = model.encode(experience_prompts, convert_to_tensor=True)
-    
-    similarity_matrix = util.cos_sim(response_embeddings, prompt_embeddings)
-    
-    matched_indices = [i for i in range(len(sentences)) if max(similarity_matrix[i]) > similarity_threshold]
-    
-    expanded_indices = set()
-    for idx in matched_indices:
-        for i in range(idx - margin, idx + margin + 1):
-            if 0 <= i < len(sentences):
-                expanded_indices.add(i)
-    
-    extracted_experience = [sentences[i] for i in sorted(expanded_indices)]
+    if not sentences:
+        return ([], pack_stats()) if with_stats else []
+
+    embeddings, scores = score_sentences(sentences, role)
+    keep = expand_matches(scores > similarity_threshold, margin)
+
+    extracted_experience, stats = pack_experience(sentences, scores, embeddings, keep, margin, token_budget)
     
-    return extracted_experience
+    return (extracted_experience, stats) if with_stats else extracted_experience
 
 
-def analyze_experience_with_llm(extracted_experience: List[str], job_description: str) -> Dict:
+def extract_experience_batch(transcripts: List[List[Dict[str, str]]], similarity_threshold: float = 0.4,
+                             margin: int = 1, role: str = None,
+                             token_budget: int = None) -> List[Tuple[List[str], Dict[str, int]]]:
     """
-    Uses Groq LLM to analyze the extracted experience and return structured metrics.
+    Extracts experience details from many transcripts with a single batched encode call.
+
+    :param transcripts: List of formatted transcripts.
+    :param similarity_threshold: Cosine similarity threshold to consider a match
+    :param margin: Number of adjacent sentences to include for context
+    :param role: Prompt bank to match against, or None for the default bank
+    :param token_budget: Maximum tokens of extracted text per transcript. Defaults to PROMPT_TOKEN_BUDGET
+    :return: One (extracted experience-related sentences, packing stats) tuple per transcript
+    """
+    sentences = [entry['content'] for transcript in transcripts for entry in transcript]
+    if not sentences:
+        return [([], pack_stats()) for _ in transcripts]
+
+    embeddings, scores = score_sentences(sentences, role)
+    matched = scores > similarity_threshold
+
+    results = []
+    offset = 0
+    for transcript in transcripts:
+        end = offset + len(transcript)
+        if end == offset:
+            # No parsed turns (e.g. an empty transcript): nothing to expand or pack
+            results.append(([], pack_stats()))
+            continue
+        # Expand and pack each transcript separately so context never leaks across candidates
+        keep = expand_matches(matched[offset:end], margin)
+        results.append(pack_experience(sentences[offset:end], scores[offset:end], embeddings[offset:end], keep,
+                                       margin, token_budget))
+        offset = end
+    return results
+
+
+def score_sentences(sentences: List[str], role: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Embeds the sentences and scores each one by its best cosine similarity to the prompt bank.
+
+    :param sentences: Sentences to score.
+    :param role: Prompt bank to match against, or None for the default bank.
+    :return: Tuple of (normalized sentence embeddings, per-sentence max similarity).
+    """
+    prompt_embeddings = get_prompt_embeddings(role)
+    with span("embedding"):
+        response_embeddings = encode(sentences)
+
+        # Both sides are L2-normalized, so the dot product is the cosine similarity
+        similarity_matrix = response_embeddings @ prompt_embeddings.T
+        return response_embeddings, similarity_matrix.max(axis=1)
+
+
+def expand_matches(mask: np.ndarray, margin: int) -> np.ndarray:
+    """
+    Dilates a boolean match mask by `margin` positions on each side.
+
+    Uses a prefix sum so every window is counted in O(1): position i is kept if any match
+    falls in [i - margin, i + margin].
+
+    :param mask: Boolean array marking matched sentences.
+    :param margin: Number of adjacent sentences to include for context.
+    :return: Boolean array marking matched sentences and their neighbours.
+    """
+    n = len(mask)
+    prefix = np.concatenate(([0], np.cumsum(mask, dtype=np.int64)))
+    positions = np.arange(n)
+    lower = np.clip(positions - margin, 0, n)
+    upper = np.clip(positions + margin + 1, 0, n)
+    return (prefix[upper] - prefix[lower]) > 0
+
+
+def build_experience_prompt(extracted_experience: List[str], job_description: str) -> str:
+    """
+    Renders the fitment prompt sent to the LLM.
 
     :param extracted_experience: List of experience-related sentences.
     :param job_description: The job description for comparison.
-    :return: JSON metrics evaluating the candidate's experience.
+    :return: The prompt text.
     """
-    if not extracted_experience:
-        return {"error": "No relevant experience found in the transcript."}
-
     experience_text = " ".join(extracted_experience)
     
-    prompt = f"""
+    return f"""
     Given the following job description and candidate's experience, evaluate the fitment:
 
     Job Description:
@@ -70,7 +141,7 @@ def analyze_experience_with_llm(extracted_experience: List[str], job_description
     Candidate's Experience:
     {experience_text}
 
-    Provide a response in **valid JSON format only** with the following structure:
+    Provide a JSON object with the following structure:
     {{
         "experience_match": 75,
         "key_strengths": ["Python", "Machine Learning"],
@@ -79,59 +150,59 @@ def analyze_experience_with_llm(extracted_experience: List[str], job_description
         "overall_fit_score": 70
     }}
 
-    STRICT REQUIREMENTS:
-    - Return only JSON, with no explanations, no formatting issues.
-    - Ensure all keys are present even if empty.
-    - Always use double quotes for keys and string values.
-    - Do not wrap the response in markdown code blocks (e.g., no ```json ... ```).
+    experience_match and overall_fit_score are percentages (0-100); complexity_handled is on a 1-10 scale.
     """
 
-    groq_client = LangChainGroqClient()
-    response = groq_client.generate_response(prompt).strip()
 
-    # Clean the response if it contains unwanted markdown/code blocks
-    if response.startswith("```json"):
-        response = response.split("```json")[1]
-        response = response.split("```")[0] if "```" in response else response
-    elif response.startswith("```"):
-        response = response.split("```")[1]
-        response = response.split("```")[0] if "```" in response else response
+def analyze_experience_with_llm(extracted_experience: List[str], job_description: str) -> Dict:
+    """
+    Uses Groq LLM to analyze the extracted experience and return structured metrics.
 
-    # Remove any inline comments (in case LLM still includes them)
-    response = re.sub(r'//.*', '', response)
+    :param extracted_experience: List of experience-related sentences.
+    :param job_description: The job description for comparison.
+    :return: JSON metrics evaluating the candidate's experience.
+    """
+    if not extracted_experience:
+        return {"error": "No relevant experience found in the transcript."}
 
-    # Try extracting JSON using a regex match (fallback)
-    json_match = re.search(r'{[\s\S]*}', response)
-    if json_match:
-        response = json_match.group(0)
+    prompt = build_experience_prompt(extracted_experience, job_description)
 
-    # Attempt JSON parsing
+    groq_client = get_client()
     try:
-        analysis = json.loads(response)
-        
-        # Ensure all expected keys exist
-        expected_keys = ["experience_match", "key_strengths", "missing_skills", 
-                         "complexity_handled", "overall_fit_score"]
-        for key in expected_keys:
-            if key not in analysis:
-                analysis[key] = None  # Fill missing keys with None
-                
-    except json.JSONDecodeError as e:
-        analysis = {
-            "error": f"Failed to parse LLM response: {str(e)}",
-            "raw_response": response[:500]
-        }
-    except Exception as e:
-        analysis = {
-            "error": f"Unexpected error: {str(e)}",
-            "raw_response": response[:500] if isinstance(response, str) else str(response)[:500]
-        }
-
-    return analysis
-
-
-def analyze_experience(transcript,job_description):
-    extracted_experience = extract_experience(transcript)
+        analysis = groq_client.generate_structured(prompt, ExperienceAnalysis, system_prompt=EXPERIENCE_SYSTEM_PROMPT,
+                                                    max_tokens=config.LLM_MAX_TOKENS)
+    except StructuredOutputError as e:
+        return {"error": f"Failed to parse LLM response: {str(e)}", "raw_response": e.raw_response[:500]}
+
+    return analysis.model_dump()
+
+
+async def analyze_experience_with_llm_async(extracted_experience: List[str], job_description: str) -> Dict:
+    """
+    Async version of analyze_experience_with_llm that awaits the Groq call.
+
+    :param extracted_experience: List of experience-related sentences.
+    :param job_description: The job description for comparison.
+    :return: JSON metrics evaluating the candidate's experience.
+    """
+    if not extracted_experience:
+        return {"error": "No relevant experience found in the transcript."}
+
+    prompt = build_experience_prompt(extracted_experience, job_description)
+
+    groq_client = get_client()
+    try:
+        analysis = await groq_client.agenerate_structured(prompt, ExperienceAnalysis,
+                                                          system_prompt=EXPERIENCE_SYSTEM_PROMPT,
+                                                          max_tokens=config.LLM_MAX_TOKENS)
+    except StructuredOutputError as e:
+        return {"error": f"Failed to parse LLM response: {str(e)}", "raw_response": e.raw_response[:500]}
+
+    return analysis.model_dump()
+
+
+def analyze_experience(transcript,job_description,role=None):
+    extracted_experience = extract_experience(transcript, role=role)
     analysis_metrics = analyze_experience_with_llm(extracted_experience, job_description)
     return analysis_metrics
 
@@ -1,17 +1,193 @@
+import codecs
 import re
-from typing import List, Dict
+from tracing import span
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, TextIO, Union
 
-def format_transcript(transcript: str) -> List[Dict[str, str]]:  
- 
-    
-    pattern = re.compile(r"([\w\s]+) \(\d{2}/\d{2}/\d{4}, \d{2}:\d{2} [APM]{2}\): (.*?)(?=(?: [\w\s]+ \(\d{2}/\d{2}/\d{4}, \d{2}:\d{2} [APM]{2}\):)|$)", re.DOTALL)
+# " (MM/DD/YYYY, HH:MM AM):" -- the fixed-width part of a speaker header. Every header is
+# "<name> (<timestamp>): "; the name is recovered by scanning back from this anchor.
+_ANCHOR = re.compile(r" \(\d{2}/\d{2}/\d{4}, \d{2}:\d{2} [APM]{2}\):")
+_ANCHOR_LENGTH = 24
+
+_READ_SIZE = 64 * 1024
+
+
+def _is_name_char(ch: str) -> bool:
+    # Same character class as [\w\s] in the re module
+    return ch.isalnum() or ch == "_" or ch.isspace()
+
+
+def _name_start(text: str, anchor: int, lower_bound: int) -> int:
+    """Returns where the run of name characters ending at `anchor` begins (never before lower_bound)."""
+    i = anchor
+    while i > lower_bound and _is_name_char(text[i - 1]):
+        i -= 1
+    return i
+
+
+class TranscriptParser:
+    """
+    Incremental, single-pass parser for "Name (MM/DD/YYYY, HH:MM AM): text" transcripts.
+
+    Feed it text in chunks of any size; each call returns the turns that are complete so far.
+    A turn is complete once the next speaker header has arrived. Each character is scanned a
+    bounded number of times, so parsing is linear in the transcript length, and the output is
+    identical to the original backtracking regex.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pending: List[str] = []  # Chunks fed since the buffer was last joined
+        self._tail = ""       # Last few characters fed, to spot a header split across chunks
+        self._pos = 0         # Where the search for the next header (or the current content) starts
+        self._scanned = 0     # Anchors before this offset have already been looked at
+        self._user: Optional[str] = None
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """
+        Adds text to the parser.
+
+        :param text: The next chunk of the transcript.
+        :return: Turns completed by this chunk.
+        """
+        if not text:
+            return []
+        self._pending.append(text)
+        window = self._tail + text
+        self._tail = window[-(_ANCHOR_LENGTH + 1):]
+        # Turns only start or end at a header, so until a new one shows up (or the one that
+        # ended the previous chunk gets its next character) there is nothing to do: the chunk
+        # is just kept, without re-joining a long turn in progress on every small chunk
+        if not any(match.end() >= len(window) - len(text) for match in _ANCHOR.finditer(window)):
+            return []
+        self._join()
+        return self._drain(final=False)
+
+    def close(self) -> List[Dict[str, str]]:
+        """
+        Signals the end of the transcript.
+
+        :return: The remaining turns, including the last one.
+        """
+        self._join()
+        turns = self._drain(final=True)
+        self._buffer, self._tail, self._pos, self._scanned, self._user = "", "", 0, 0, None
+        return turns
+
+    def _join(self):
+        dead = self._pos
+        if dead and dead > len(self._buffer) // 2:
+            # Drop consumed text once it is most of the buffer, so compaction stays amortized linear
+            self._buffer = self._buffer[dead:]
+            self._pos = 0
+            self._scanned = max(self._scanned - dead, 0)
+        if self._pending:
+            self._buffer += "".join(self._pending)
+            self._pending = []
 
-    formatted_messages = []  
-    for match in pattern.findall(transcript):  
-        user, content = match  
-        formatted_messages.append({"user": user.strip(), "content": content.strip()})  
+    def _drain(self, final: bool) -> List[Dict[str, str]]:
+        turns = []
+        while True:
+            if self._user is None:
+                if not self._find_header(final):
+                    break
+            else:
+                turn = self._find_content_end(final)
+                if turn is None:
+                    break
+                turns.append(turn)
+        return turns
+
+    def _find_header(self, final: bool) -> bool:
+        buffer = self._buffer
+        for match in _ANCHOR.finditer(buffer, max(self._pos, self._scanned)):
+            anchor, end = match.span()
+            if end == len(buffer) and not final:
+                # Wait for the next chunk to see whether the header is followed by a space
+                self._scanned = anchor
+                return False
+            start = _name_start(buffer, anchor, self._pos)
+            if start < anchor and end < len(buffer) and buffer[end] == " ":
+                self._user = buffer[start:anchor].strip()
+                self._pos = self._scanned = end + 1
+                return True
+            self._scanned = end
+
+        if final:
+            self._pos = len(buffer)
+        else:
+            self._scanned = max(self._scanned, len(buffer) - _ANCHOR_LENGTH)
+        return False
+
+    def _find_content_end(self, final: bool) -> Optional[Dict[str, str]]:
+        buffer, content_start = self._buffer, self._pos
+        for match in _ANCHOR.finditer(buffer, max(content_start, self._scanned)):
+            anchor = match.start()
+            # The turn ends at the first space in the name-character run before the next
+            # header, provided at least one name character remains after it
+            start = _name_start(buffer, anchor, content_start)
+            end = buffer.find(" ", start, anchor - 1) if anchor - 1 > start else -1
+            if end != -1:
+                turn = {"user": self._user, "content": buffer[content_start:end].strip()}
+                # Consumed text stays in the buffer until the next compaction (see _join)
+                self._pos, self._scanned, self._user = end, end, None
+                return turn
+            self._scanned = match.end()
+
+        if final:
+            turn = {"user": self._user, "content": buffer[content_start:].strip()}
+            self._pos, self._scanned, self._user = len(buffer), len(buffer), None
+            return turn
+
+        self._scanned = max(self._scanned, len(buffer) - _ANCHOR_LENGTH)
+        return None
+
+
+def iter_turns(source: Union[str, TextIO, Iterable[str]]) -> Iterator[Dict[str, str]]:
+    """
+    Yields transcript turns incrementally.
+
+    :param source: The transcript as a string, a text file object, or an iterable of text chunks.
+    :return: Iterator of {"user": "Name", "content": "Message"} dicts.
+    """
+    parser = TranscriptParser()
+    if isinstance(source, str):
+        chunks = (source,)
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(_READ_SIZE), "")
+    else:
+        chunks = source
+
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_turns(stream: AsyncIterable[bytes], encoding: str = "utf-8") -> AsyncIterator[Dict[str, str]]:
+    """
+    Yields transcript turns from an async byte stream as they arrive (e.g. `request.stream()`).
+
+    :param stream: Async iterable of byte chunks.
+    :param encoding: Text encoding of the stream.
+    :return: Async iterator of {"user": "Name", "content": "Message"} dicts.
+    """
+    parser = TranscriptParser()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    async for chunk in stream:
+        for turn in parser.feed(decoder.decode(chunk)):
+            yield turn
+    for turn in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+        yield turn
+
+
+def format_transcript(transcript: str) -> List[Dict[str, str]]:  
+    """
+    Splits a raw transcript into speaker turns.
 
-    return formatted_messages  
+    :param transcript: Raw "Name (MM/DD/YYYY, HH:MM AM): text" transcript.
+    :return: List of formatted transcript objects [{"user": "Name", "content": "Message"}]
+    """
+    with span("parse"):
+        return list(iter_turns(transcript))
 
 
 
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import language_tool_python
+
+import config
+from cache import LRUCache
+from metrics import REGISTRY
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+GRAMMAR_CACHE_REQUESTS = REGISTRY.counter("analyzer_grammar_cache_requests_total",
+                                          "Grammar check lookups per chunk by result.")
+GRAMMAR_CACHE_HIT_RATIO = REGISTRY.gauge("analyzer_grammar_cache_hit_ratio",
+                                         "Share of grammar-checked chunks answered from the cache.")
+LANGUAGETOOL_START_SECONDS = REGISTRY.gauge("analyzer_languagetool_start_seconds",
+                                            "Time taken to start or connect to LanguageTool.")
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+_tool: Optional[language_tool_python.LanguageTool] = None
+_tool_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_cache = LRUCache(config.GRAMMAR_CACHE_SIZE)
+
+
+def _collect_hit_ratio():
+    hits, misses = GRAMMAR_CACHE_REQUESTS.value(result="hit"), GRAMMAR_CACHE_REQUESTS.value(result="miss")
+    GRAMMAR_CACHE_HIT_RATIO.set(round(hits / (hits + misses), 4) if hits + misses else 0.0)
+
+
+REGISTRY.on_collect(_collect_hit_ratio)
+
+
+def get_grammar_tool() -> language_tool_python.LanguageTool:
+    """
+    Returns the process-wide LanguageTool handle, starting it on first use.
+
+    With LANGUAGETOOL_URL set, every worker talks to that one server; otherwise a local
+    server is spawned once per process.
+    """
+    global _tool
+    if _tool is None:
+        with _tool_lock:
+            if _tool is None:
+                start = time.perf_counter()
+                if config.LANGUAGETOOL_URL:
+                    _tool = language_tool_python.LanguageTool(config.LANGUAGETOOL_LANGUAGE,
+                                                              remote_server=config.LANGUAGETOOL_URL)
+                else:
+                    _tool = language_tool_python.LanguageTool(config.LANGUAGETOOL_LANGUAGE)
+                elapsed = time.perf_counter() - start
+                LANGUAGETOOL_START_SECONDS.set(elapsed)
+                logger.info("LanguageTool ready in %.2fs", elapsed)
+    return _tool
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.GRAMMAR_CHECK_WORKERS, thread_name_prefix="grammar")
+    return _executor
+
+
+def _chunk_key(chunk: str) -> str:
+    return hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+
+
+def _check_chunk(chunk: str) -> List[str]:
+    return [match.message for match in get_grammar_tool().check(chunk)]
+
+
+def check_chunks(chunks: List[str]) -> List[List[str]]:
+    """
+    Grammar-checks each chunk, in parallel, skipping chunks that were checked before.
+
+    :param chunks: Pieces of text to check, typically one per utterance.
+    :return: The grammar messages found in each chunk, in input order.
+    """
+    results: List[Optional[List[str]]] = [None] * len(chunks)
+    pending: Dict[str, List[int]] = {}
+
+    for i, chunk in enumerate(chunks):
+        if not chunk.strip():
+            results[i] = []
+            continue
+        key = _chunk_key(chunk)
+        cached = _cache.get(key)
+        if cached is not None:
+            GRAMMAR_CACHE_REQUESTS.inc(result="hit")
+            results[i] = cached
+        else:
+            GRAMMAR_CACHE_REQUESTS.inc(result="miss")
+            # Repeated sentences within the same call are only checked once
+            pending.setdefault(key, []).append(i)
+
+    if pending:
+        keys = list(pending)
+        texts = [chunks[pending[key][0]] for key in keys]
+        with span("grammar"):
+            checked = list(_get_executor().map(_check_chunk, texts))
+        for key, messages in zip(keys, checked):
+            _cache.put(key, messages)
+            for i in pending[key]:
+                results[i] = messages
+
+    return results
+
+
+def split_chunks(text: str) -> List[str]:
+    """
+    Splits free text into sentence-sized chunks for check_chunks.
+
+    :param text: The text to split.
+    :return: Non-empty sentences, line by line.
+    """
+    return [sentence for line in text.splitlines() for sentence in _SENTENCE_BOUNDARY.split(line) if sentence.strip()]
+
+
+def check_text(text: str) -> List[str]:
+    """
+    Grammar-checks free text by splitting it into sentences and checking them in parallel.
+
+    :param text: The text to check.
+    :return: All grammar messages found, in text order.
+    """
+    return [message for messages in check_chunks(split_chunks(text)) for message in messages]
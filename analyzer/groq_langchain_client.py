@@ -1,34 +1,220 @@
-import os
-from dotenv import load_dotenv
+import asyncio
+import functools
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Type, TypeVar
+
+import groq
+import httpx
 from langchain_groq import ChatGroq  # Correct import from the langchain_groq package
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
+from pydantic import BaseModel, ValidationError
+
+import config
+from llm_cache import cache_key, get_cache
+from metrics import REGISTRY
+from tracing import span
+
+LLM_IN_FLIGHT = REGISTRY.gauge("analyzer_llm_in_flight", "Groq requests currently in flight.")
+LLM_RETRIES = REGISTRY.counter("analyzer_llm_retries_total", "Groq requests retried after a 429, 5xx or connection error.")
+
+LLM_SCHEMA_FAILURES = REGISTRY.counter("analyzer_llm_schema_failures_total",
+                                       "Structured LLM replies that failed schema validation.")
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class StructuredOutputError(Exception):
+    def __init__(self, message: str, raw_response: str):
+        """
+        Raised when the LLM's reply still doesn't match the requested schema after every attempt.
+
+        :param message: The validation error.
+        :param raw_response: The last reply received.
+        """
+        super().__init__(message)
+        self.raw_response = raw_response
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # Seconds the API asked us to wait (Retry-After as seconds or an HTTP date), if it said
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying, or None if the call should not be retried.
+
+    A Retry-After from the API (sent with 429s and some 503s) is honoured up to
+    LLM_RETRY_AFTER_MAX; otherwise the delay is exponential backoff with full jitter.
+    """
+    if not _is_retryable(error):
+        return None
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return retry_after if retry_after <= config.LLM_RETRY_AFTER_MAX else None
+    return random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_format(schema: Type[BaseModel]) -> str:
+    # Cache-key response format: changing any field, type or bound starts a fresh set of entries
+    schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return f"json:{schema.__name__}:{hashlib.sha256(schema_json.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _cached_structured(cache, key: str, schema: Type[SchemaT]) -> Optional[SchemaT]:
+    # A cached reply that no longer validates (e.g. written before a schema change) is a miss
+    cached = cache.get(key) if cache is not None else None
+    if cached is None:
+        return None
+    try:
+        return schema.model_validate_json(cached)
+    except ValidationError:
+        return None
 
-load_dotenv()
 
 class LangChainGroqClient:
-    def __init__(self, api_key: str = None, model: str = "llama3-8b-8192"):
+    def __init__(self, api_key: str = None, model: str = None, base_url: str = None,
+                 max_in_flight: int = None, max_retries: int = None):
         """
         Initializes the Groq LLM client using LangChain.
+
+        The client keeps its HTTP connections alive between calls and is safe to share across
+        threads and coroutines; use get_client() to get the process-wide instance.
         
         :param api_key: API key for Groq. If None, it fetches from environment variables.
-        :param model: The Groq model to use.
+        :param model: The Groq model to use. Defaults to GROQ_MODEL.
+        :param base_url: Groq API base URL. Defaults to GROQ_BASE_URL, then the public API.
+        :param max_in_flight: Maximum concurrent requests. Defaults to LLM_MAX_IN_FLIGHT.
+        :param max_retries: Retries on 429/5xx/connection errors. Defaults to LLM_MAX_RETRIES.
         """
-        self.api_key = api_key or os.getenv("GROQ_API_KEY")
-        self.model = model
+        self.api_key = api_key or config.GROQ_API_KEY
+        self.model = model or config.GROQ_MODEL
+        self.base_url = base_url or config.GROQ_BASE_URL
+        self.max_in_flight = max_in_flight or config.LLM_MAX_IN_FLIGHT
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
         
         if not self.api_key:
             raise ValueError("Groq API key is required. Set GROQ_API_KEY as an env variable or pass it explicitly.")
+
+        limits = httpx.Limits(max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+                              max_keepalive_connections=config.LLM_HTTP_MAX_CONNECTIONS)
+        self._http_client = httpx.Client(limits=limits, timeout=config.LLM_TIMEOUT)
+        self._http_async_client = httpx.AsyncClient(limits=limits, timeout=config.LLM_TIMEOUT)
         
-        # Initialize the chat model
+        # Initialize the chat model; retries are handled here so they share the jittered backoff
         self.chat_model = ChatGroq(
             api_key=self.api_key,
             model_name=self.model,
+            base_url=self.base_url,
             temperature=0.7,
-            max_tokens=512
+            max_tokens=512,
+            max_retries=0,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client
         )
 
+        # One limit for the whole process: sync callers and every event loop share this semaphore
+        self._semaphore = threading.BoundedSemaphore(self.max_in_flight)
+        # Coroutines that find no free slot wait for one on these threads, not on the event loop
+        self._slot_waiters = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="llm-slot")
+
+    async def _acquire_async(self):
+        if self._semaphore.acquire(blocking=False):
+            return
+        future = asyncio.get_running_loop().run_in_executor(self._slot_waiters, self._semaphore.acquire)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The waiting thread still takes the slot; hand it back as soon as it does
+            future.add_done_callback(lambda _: self._semaphore.release())
+            raise
+
+    @staticmethod
+    def _effective_temperature(temperature: float) -> float:
+        # Deterministic mode pins temperature so identical prompts give reproducible, cacheable answers
+        return 0.0 if config.LLM_FORCE_DETERMINISTIC else temperature
+
+    def _invoke(self, messages, **call_kwargs) -> str:
+        with span("llm"):
+            return self._invoke_with_retries(messages, **call_kwargs)
+
+    async def _ainvoke(self, messages, **call_kwargs) -> str:
+        with span("llm"):
+            return await self._ainvoke_with_retries(messages, **call_kwargs)
+
+    def _invoke_with_retries(self, messages, **call_kwargs) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._semaphore:
+                    LLM_IN_FLIGHT.inc()
+                    try:
+                        # Pass the parameters per call so threads sharing the client don't overwrite each other
+                        return self.chat_model.invoke(messages, **call_kwargs).content
+                    finally:
+                        LLM_IN_FLIGHT.dec()
+
+            except Exception as e:
+                delay = _retry_delay(e, attempt) if attempt < self.max_retries else None
+                if delay is not None:
+                    LLM_RETRIES.inc()
+                    time.sleep(delay)
+                    continue
+                error_msg = f"LangChain Groq error: {str(e)}"
+                raise Exception(error_msg)
+
+    async def _ainvoke_with_retries(self, messages, **call_kwargs) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._acquire_async()
+                LLM_IN_FLIGHT.inc()
+                try:
+                    return (await self.chat_model.ainvoke(messages, **call_kwargs)).content
+                finally:
+                    LLM_IN_FLIGHT.dec()
+                    self._semaphore.release()
+
+            except Exception as e:
+                delay = _retry_delay(e, attempt) if attempt < self.max_retries else None
+                if delay is not None:
+                    LLM_RETRIES.inc()
+                    await asyncio.sleep(delay)
+                    continue
+                error_msg = f"LangChain Groq error: {str(e)}"
+                raise Exception(error_msg)
+
     def generate_response(self, prompt: str, system_prompt: str = "You are an AI assistant.", 
                          temperature: float = 0.7, max_tokens: int = 512):
         """
@@ -40,27 +226,162 @@ class LangChainGroqClient:
         :param max_tokens: Maximum tokens in the response.
         :return: The response text from Groq.
         """
-        # Update the parameters
-        self.chat_model.temperature = temperature
-        self.chat_model.max_tokens = max_tokens
-        
-        try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=prompt)
-            ]
-            
-            # Generate and return the response
-            response = self.chat_model.invoke(messages)
-            return response.content
-            
-        except Exception as e:
-            error_msg = f"LangChain Groq error: {str(e)}"
-            raise Exception(error_msg)
+        temperature = self._effective_temperature(temperature)
+        cache, key = get_cache(), cache_key(self.model, temperature, system_prompt, prompt, max_tokens)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=prompt)
+        ]
+        content = self._invoke(messages, temperature=temperature, max_tokens=max_tokens)
+        if cache is not None:
+            cache.put(key, content)
+        return content
+
+    async def agenerate_response(self, prompt: str, system_prompt: str = "You are an AI assistant.",
+                                 temperature: float = 0.7, max_tokens: int = 512):
+        """
+        Async version of generate_response; awaits the HTTP call instead of blocking the event loop.
+
+        :param prompt: The input prompt for the model.
+        :param system_prompt: Optional system prompt to set context.
+        :param temperature: Controls randomness (0 = deterministic, 1 = more random).
+        :param max_tokens: Maximum tokens in the response.
+        :return: The response text from Groq.
+        """
+        temperature = self._effective_temperature(temperature)
+        cache, key = get_cache(), cache_key(self.model, temperature, system_prompt, prompt, max_tokens)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=prompt)
+        ]
+        content = await self._ainvoke(messages, temperature=temperature, max_tokens=max_tokens)
+        if cache is not None:
+            cache.put(key, content)
+        return content
+
+    @staticmethod
+    def _structured_messages(prompt: str, schema: Type[BaseModel], system_prompt: str):
+        schema_text = json.dumps(schema.model_json_schema())
+        return [
+            SystemMessage(content=f"{system_prompt}\nRespond with a single JSON object matching this JSON schema:\n{schema_text}"),
+            HumanMessage(content=prompt)
+        ]
+
+    def generate_structured(self, prompt: str, schema: Type[SchemaT], system_prompt: str = "You are an AI assistant.",
+                            temperature: float = 0.7, max_tokens: int = 512, max_attempts: int = None) -> SchemaT:
+        """
+        Generates a response in JSON mode and validates it into `schema`.
+
+        The API is asked for a JSON object (response_format json_object) described by the schema,
+        and the reply is validated once with pydantic. Only replies that fail validation are
+        retried; only valid replies are cached, keyed by the full JSON schema, and a cached reply
+        that no longer validates is treated as a miss.
+
+        :param prompt: The input prompt for the model.
+        :param schema: Pydantic model the response must match.
+        :param system_prompt: Optional system prompt to set context.
+        :param temperature: Controls randomness (0 = deterministic, 1 = more random).
+        :param max_tokens: Maximum tokens in the response.
+        :param max_attempts: Calls to make before giving up on an invalid reply. Defaults to LLM_SCHEMA_ATTEMPTS.
+        :return: The validated schema instance.
+        :raises StructuredOutputError: If no attempt produced a valid reply.
+        """
+        temperature = self._effective_temperature(temperature)
+        cache = get_cache()
+        key = cache_key(self.model, temperature, system_prompt, prompt, max_tokens, _schema_format(schema))
+        cached = _cached_structured(cache, key, schema)
+        if cached is not None:
+            return cached
+
+        messages = self._structured_messages(prompt, schema, system_prompt)
+        content, error = "", None
+        for _ in range(max_attempts or config.LLM_SCHEMA_ATTEMPTS):
+            content = self._invoke(messages, temperature=temperature, max_tokens=max_tokens,
+                                   response_format={"type": "json_object"})
+            try:
+                result = schema.model_validate_json(content)
+            except ValidationError as e:
+                LLM_SCHEMA_FAILURES.inc()
+                error = e
+                continue
+            if cache is not None:
+                cache.put(key, content)
+            return result
+        raise StructuredOutputError(str(error), content)
+
+    async def agenerate_structured(self, prompt: str, schema: Type[SchemaT],
+                                   system_prompt: str = "You are an AI assistant.", temperature: float = 0.7,
+                                   max_tokens: int = 512, max_attempts: int = None) -> SchemaT:
+        """
+        Async version of generate_structured.
+
+        :param prompt: The input prompt for the model.
+        :param schema: Pydantic model the response must match.
+        :param system_prompt: Optional system prompt to set context.
+        :param temperature: Controls randomness (0 = deterministic, 1 = more random).
+        :param max_tokens: Maximum tokens in the response.
+        :param max_attempts: Calls to make before giving up on an invalid reply. Defaults to LLM_SCHEMA_ATTEMPTS.
+        :return: The validated schema instance.
+        :raises StructuredOutputError: If no attempt produced a valid reply.
+        """
+        temperature = self._effective_temperature(temperature)
+        cache = get_cache()
+        key = cache_key(self.model, temperature, system_prompt, prompt, max_tokens, _schema_format(schema))
+        cached = _cached_structured(cache, key, schema)
+        if cached is not None:
+            return cached
+
+        messages = self._structured_messages(prompt, schema, system_prompt)
+        content, error = "", None
+        for _ in range(max_attempts or config.LLM_SCHEMA_ATTEMPTS):
+            content = await self._ainvoke(messages, temperature=temperature, max_tokens=max_tokens,
+                                          response_format={"type": "json_object"})
+            try:
+                result = schema.model_validate_json(content)
+            except ValidationError as e:
+                LLM_SCHEMA_FAILURES.inc()
+                error = e
+                continue
+            if cache is not None:
+                cache.put(key, content)
+            return result
+        raise StructuredOutputError(str(error), content)
+
+
+_clients: Dict[str, LangChainGroqClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(model: str = None) -> LangChainGroqClient:
+    """
+    Returns the process-wide client for a model, creating it on first use.
+
+    :param model: The Groq model to use. Defaults to GROQ_MODEL.
+    :return: A shared LangChainGroqClient.
+    """
+    model = model or config.GROQ_MODEL
+    client = _clients.get(model)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(model)
+            if client is None:
+                client = LangChainGroqClient(model=model)
+                _clients[model] = client
+    return client
 
 # Example Usage
 if __name__ == "__main__":
-    client = LangChainGroqClient()
+    client = get_client()
     
     # Simple generation example
     try:
@@ -70,4 +391,4 @@ if __name__ == "__main__":
         )
         print("Basic response:", response)
     except Exception as e:
-        print(f"Error generating response: {str(e)}")
\ No newline at end of file
+        print(f"Error generating response: {str(e)}")
@@ -0,0 +1,32 @@
+# Multi-process deployment: gunicorn -c gunicorn.conf.py (run from this directory)
+#
+# The parent loads the embedding model, prompt indexes and one LanguageTool server, then
+# forks WORKERS uvicorn workers that share them. Each worker still runs its own thread pools,
+# job queue workers and caches, all created after the fork.
+#
+# Live sessions (/sessions) are kept in the memory of the worker that created them, and the
+# WebSocket is no exception: a request that reaches another worker gets 421 (4421 on the
+# WebSocket). Run live sessions with WORKERS=1, or behind a proxy that routes on the session
+# id, whose prefix names the owning worker's pid.
+# /metrics reports the worker that answered the scrape.
+import os
+
+# Every top-level name here is read as a gunicorn setting, and "config" is one of them
+import config as analyzer_config
+import prefork
+
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = analyzer_config.WORKERS or os.cpu_count() or 1
+bind = analyzer_config.BIND
+preload_app = True
+# Model loading happens before the workers start, so the default timeout only covers requests
+timeout = 120
+
+
+def on_starting(server):
+    prefork.prepare_parent(server.cfg.workers)
+
+
+def on_exit(server):
+    prefork.stop_grammar_server()
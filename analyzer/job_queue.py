@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+import config
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JOBS_QUEUED = REGISTRY.gauge("analyzer_jobs_queued", "Analysis jobs waiting for a worker.")
+JOBS_FINISHED = REGISTRY.counter("analyzer_jobs_finished_total", "Analysis jobs finished, by final status.")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def job_id_for(request: Dict) -> str:
+    """
+    Idempotency key of a job: a hash of the transcript and everything else that affects the result.
+
+    :param request: The job request (transcript, job_description, role, candidate).
+    :return: Hex SHA-256 digest.
+    """
+    key = [request.get("transcript"), request.get("job_description"), request.get("role"), request.get("candidate")]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    def __init__(self, path: str):
+        """
+        Jobs and their results, persisted in SQLite so queued and running work survives a crash.
+
+        :param path: Path of the SQLite database; several processes may share it.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, result TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, callback_url TEXT, lease_until REAL, "
+            "created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)")
+
+    def submit(self, request: Dict, callback_url: str = None) -> Dict:
+        """
+        Queues a job, or returns the existing one for the same request.
+
+        A job that previously failed is queued again.
+
+        :param request: The job request (transcript, job_description, role, candidate).
+        :param callback_url: URL to POST the finished job to.
+        :return: The job record.
+        """
+        job_id = job_id_for(request)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, status, request, callback_url, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                        (job_id, QUEUED, json.dumps(request), callback_url, now, now)
+                    )
+                elif row[0] == FAILED:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = 0, error = NULL, updated = ? WHERE id = ?",
+                        (QUEUED, now, job_id)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, result, error, attempts, created, updated FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "attempts": row[4],
+            "created": row[5],
+            "updated": row[6]
+        }
+
+    def expire(self) -> List[Dict]:
+        """
+        Fails running jobs whose lease expired (their worker died) on their last allowed attempt.
+
+        :return: The failed jobs, as dicts with job_id and callback_url.
+        """
+        now = time.time()
+        where = "status = ? AND lease_until < ? AND attempts >= ?"
+        params = (RUNNING, now, config.JOB_MAX_ATTEMPTS)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(f"SELECT id, callback_url FROM jobs WHERE {where}", params).fetchall()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated = ? WHERE {where}",
+                        (FAILED, "Lease expired on the last attempt; the worker running the job stopped.", now)
+                        + params
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{"job_id": row[0], "callback_url": row[1]} for row in rows]
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Takes the oldest queued job, or a running job whose lease has expired (its worker died)
+        and that has attempts left; see expire() for the ones that have none.
+
+        :return: Dict with job_id, request, callback_url and attempts, or None if there is no work.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, request, callback_url, attempts FROM jobs "
+                    "WHERE status = ? OR (status = ? AND lease_until < ? AND attempts < ?) ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING, now, config.JOB_MAX_ATTEMPTS)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated = ? WHERE id = ?",
+                        (RUNNING, now + config.JOB_LEASE, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"job_id": row[0], "request": json.loads(row[1]), "callback_url": row[2], "attempts": row[3] + 1}
+
+    def renew(self, job_id: str):
+        """Extends a running job's lease by JOB_LEASE seconds from now."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?",
+                               (time.time() + config.JOB_LEASE, job_id, RUNNING))
+
+    def complete(self, job_id: str, result: Dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated = ? WHERE id = ?",
+                (DONE, json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, retry: bool):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                (QUEUED if retry else FAILED, error, time.time(), job_id)
+            )
+
+    def queued(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+    def prune(self, older_than: float):
+        """Deletes finished and failed jobs last updated more than `older_than` seconds ago."""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                               (DONE, FAILED, time.time() - older_than))
+
+
+class JobQueue:
+    # Seconds an idle worker waits before checking the store again (other processes may add work)
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, store: JobStore, handler: Callable[[Dict], Dict], workers: int):
+        """
+        Bounded pool of worker threads processing jobs from a JobStore.
+
+        :param store: Where jobs are persisted.
+        :param handler: Function that turns a job request into its result.
+        :param workers: Number of worker threads.
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+
+    def start(self):
+        self.store.prune(config.JOB_RESULT_TTL)
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, request: Dict, callback_url: str = None) -> Dict:
+        job = self.store.submit(request, callback_url)
+        if job["status"] == QUEUED:
+            JOBS_QUEUED.set(self.store.queued())
+            with self._wakeup:
+                self._wakeup.notify()
+        return job
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._run_once()
+            except Exception:
+                # A store error (e.g. the database is locked or its disk is full) must not kill the worker
+                logger.exception("Job worker error; retrying in %gs", self.POLL_INTERVAL)
+                self._stop.wait(self.POLL_INTERVAL)
+
+    def _run_once(self):
+        for job in self.store.expire():
+            JOBS_FINISHED.inc(status=FAILED)
+            self._callback(job)
+
+        job = self.store.claim()
+        if job is None:
+            with self._wakeup:
+                self._wakeup.wait(self.POLL_INTERVAL)
+            return
+
+        JOBS_QUEUED.set(self.store.queued())
+        try:
+            result = self._handle(job)
+        except Exception as e:
+            retry = job["attempts"] < config.JOB_MAX_ATTEMPTS
+            logger.exception("Job %s failed (attempt %d)", job["job_id"], job["attempts"])
+            self.store.fail(job["job_id"], str(e), retry)
+            if not retry:
+                JOBS_FINISHED.inc(status=FAILED)
+                self._callback(job)
+            return
+
+        self.store.complete(job["job_id"], result)
+        JOBS_FINISHED.inc(status=DONE)
+        self._callback(job)
+
+    def _handle(self, job: Dict) -> Dict:
+        # Keep renewing the lease while the handler runs, so a slow job is not picked up again
+        # by another worker; the lease only lapses if this process dies
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(job["job_id"], done),
+                                     name=f"job-lease-{job['job_id'][:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            return self.handler(job["request"])
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _renew_lease(self, job_id: str, done: threading.Event):
+        while not done.wait(config.JOB_LEASE / 3):
+            try:
+                self.store.renew(job_id)
+            except Exception:
+                logger.exception("Could not renew the lease of job %s", job_id)
+
+    def _callback(self, job: Dict):
+        if not job["callback_url"]:
+            return
+        try:
+            httpx.post(job["callback_url"], json=self.store.get(job["job_id"]), timeout=config.JOB_CALLBACK_TIMEOUT)
+        except httpx.HTTPError as e:
+            logger.warning("Callback for job %s to %s failed: %s", job["job_id"], job["callback_url"], e)
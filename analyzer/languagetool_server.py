@@ -0,0 +1,26 @@
+import sys
+
+import language_tool_python
+
+import config
+
+
+def main():
+    """
+    Runs one local LanguageTool server for a group of analyzer processes.
+
+    Prints the server's base URL on stdout once it is ready, then keeps it running until
+    stdin is closed. The parent process hands that URL to its workers as LANGUAGETOOL_URL,
+    so they share this JVM instead of each starting their own.
+    """
+    tool = language_tool_python.LanguageTool(config.LANGUAGETOOL_LANGUAGE)
+    try:
+        print(f"http://127.0.0.1:{tool._port}", flush=True)
+        # Blocks until the parent closes the pipe (or dies)
+        sys.stdin.read()
+    finally:
+        tool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import threading
+from collections import deque
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+from experience_analyzer import expand_matches, score_sentences
+from format_transcript import TranscriptParser
+from prompt_builder import pack_experience, pack_stats
+from sentiment_analyzer import TranscriptSentiment
+
+
+def _process_tag() -> str:
+    return f"{os.getpid():x}"
+
+
+class LiveSession:
+    def __init__(self, role: str = None, candidate: str = None, similarity_threshold: float = 0.4, margin: int = 1):
+        """
+        Analysis state for an interview that is still in progress.
+
+        Transcript text is fed in as it is spoken. Each completed turn is embedded and scored
+        against the prompt bank once, and filler, grammar and polarity totals are kept up to
+        date, so finishing the session only has to run the LLM evaluation.
+
+        :param role: Prompt bank to match against, or None for the default bank.
+        :param candidate: The candidate's name, if known.
+        :param similarity_threshold: Cosine similarity threshold to consider a match
+        :param margin: Number of adjacent sentences to include for context
+        """
+        # Tagged with the process that holds the session, so other worker processes can tell a
+        # misrouted request from an unknown session (see SessionStore.owned_elsewhere)
+        self.session_id = f"{_process_tag()}.{uuid.uuid4().hex}"
+        self.role = role
+        self.similarity_threshold = similarity_threshold
+        self.margin = margin
+        self.created = self.last_active = time.time()
+
+        self.parser = TranscriptParser()
+        self.sentiment = TranscriptSentiment(candidate)
+        self.sentences: List[str] = []
+        self._scores: List[np.ndarray] = []
+        self._embeddings: List[np.ndarray] = []
+        self._matches = 0
+        self.finished = False
+
+        # Text is queued in arrival order and drained on worker threads, one drain at a time, so
+        # turns stay in order even when a timed-out drain is still running as the next one starts
+        self._inbox = deque()
+        self._lock = threading.Lock()
+        self._status = self._snapshot()
+
+    def _add_turns(self, turns: List[Dict[str, str]]):
+        if not turns:
+            return
+        sentences = [turn["content"] for turn in turns]
+        embeddings, scores = score_sentences(sentences, self.role)
+        self.sentences.extend(sentences)
+        self._embeddings.append(embeddings)
+        self._scores.append(scores)
+        self._matches += int((scores > self.similarity_threshold).sum())
+        self.sentiment.add_turns(turns)
+
+    def _snapshot(self) -> Dict:
+        status = self.sentiment.summary()
+        status["session_id"] = self.session_id
+        status["experience_matches"] = self._matches
+        status["finished"] = self.finished
+        return status
+
+    def _drain(self) -> int:
+        completed = 0
+        while self._inbox:
+            turns = self.parser.feed(self._inbox.popleft())
+            self._add_turns(turns)
+            completed += len(turns)
+        return completed
+
+    def queue(self, text: str):
+        """
+        Queues newly spoken transcript text without processing it; see drain().
+
+        Cheap enough to call on the event loop, so text is queued in the order it arrived.
+
+        :param text: The next piece of the raw "Name (MM/DD/YYYY, HH:MM AM): text" transcript.
+        """
+        if self.finished:
+            raise ValueError("Session is already finished.")
+        self.last_active = time.time()
+        self._inbox.append(text)
+
+    def drain(self) -> int:
+        """
+        Parses, embeds and scores all queued text, in the order it was queued.
+
+        :return: Number of turns completed.
+        """
+        with self._lock:
+            completed = self._drain()
+            self._status = self._snapshot()
+            return completed
+
+    def feed(self, text: str) -> int:
+        """
+        Adds newly spoken transcript text and processes it.
+
+        :param text: The next piece of the raw "Name (MM/DD/YYYY, HH:MM AM): text" transcript.
+        :return: Number of turns completed, including by text queued earlier.
+        """
+        self.queue(text)
+        return self.drain()
+
+    def close(self):
+        """Processes any queued text and flushes the final turn; after this the session accepts no more text."""
+        with self._lock:
+            if not self.finished:
+                self._drain()
+                self._add_turns(self.parser.close())
+                self.finished = True
+                self._status = self._snapshot()
+
+    @property
+    def scores(self) -> np.ndarray:
+        return np.concatenate(self._scores) if self._scores else np.zeros(0, dtype=np.float32)
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        return np.vstack(self._embeddings) if self._embeddings else None
+
+    @property
+    def transcript(self) -> List[Dict[str, str]]:
+        return [{"user": turn["user"], "content": turn["content"]} for turn in self.sentiment.turns]
+
+    def extracted_experience(self, with_stats: bool = False):
+        """
+        The experience-related sentences found so far, with their context, packed for the LLM prompt.
+
+        :param with_stats: Also return the packing stats (see prompt_builder.pack_experience).
+        :return: List of sentences, or a (sentences, stats) tuple with with_stats.
+        """
+        with self._lock:
+            if not self.sentences:
+                return ([], pack_stats()) if with_stats else []
+            scores = self.scores
+            keep = expand_matches(scores > self.similarity_threshold, self.margin)
+            extracted, stats = pack_experience(self.sentences, scores, self.embeddings, keep, self.margin)
+            return (extracted, stats) if with_stats else extracted
+
+    def report(self) -> Dict:
+        """Closes the session and builds the final sentiment report (see TranscriptSentiment.report)."""
+        self.close()
+        with self._lock:
+            return self.sentiment.report()
+
+    def status(self) -> Dict:
+        """
+        Running totals for the interview so far, as of the last completed drain.
+
+        Never waits for a drain in progress, so it is safe to call on the event loop.
+        """
+        return dict(self._status)
+
+
+class SessionStore:
+    def __init__(self, ttl: float, max_sessions: int):
+        """
+        In-memory registry of live sessions, dropping ones that have been idle longer than `ttl`.
+
+        Sessions live in the memory of the process that created them. With several worker
+        processes (WORKERS > 1 under gunicorn) every request for a session must reach that same
+        process, so live sessions need WORKERS=1 or a proxy that routes on the session id.
+
+        :param ttl: Seconds of inactivity before a session expires.
+        :param max_sessions: Sessions allowed at once.
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, LiveSession] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_active < cutoff]:
+            self.remove(session_id)
+
+    def create(self, **kwargs) -> LiveSession:
+        self._expire()
+        if len(self._sessions) >= self.max_sessions:
+            raise OverflowError(f"Too many live sessions ({len(self._sessions)})")
+        session = LiveSession(**kwargs)
+        self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        self._expire()
+        return self._sessions.get(session_id)
+
+    def owned_elsewhere(self, session_id: str) -> bool:
+        """True if the session id was issued by another worker process, which may still hold it."""
+        if config.WORKERS <= 1:
+            return False
+        owner, _, _ = session_id.partition(".")
+        return owner != _process_tag() and session_id not in self._sessions
+
+    def remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Per-session lock that keeps a session's chunks in arrival order."""
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+
+sessions = SessionStore(config.SESSION_TTL, config.MAX_SESSIONS)
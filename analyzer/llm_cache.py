@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+from typing import Dict, Iterable, Optional
+
+import config
+from cache import LRUCache, SQLiteCache, report_hit_ratio, tier_stats, tiered_get_many
+from metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter("analyzer_llm_cache_requests_total", "LLM cache lookups by tier and result.")
+CACHE_HIT_RATIO = REGISTRY.gauge("analyzer_llm_cache_hit_ratio", "Share of LLM cache lookups answered from either tier.")
+
+
+def cache_key(model: str, temperature: float, system_prompt: str, prompt: str, max_tokens: int,
+              response_format: str = "text") -> str:
+    """
+    Content address of an LLM call: a hash of everything that determines the response.
+
+    :return: Hex SHA-256 digest.
+    """
+    payload = json.dumps([model, temperature, system_prompt, prompt, max_tokens, response_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, max_entries: int, db_path: str = None, ttl: float = None, max_rows: int = None):
+        """
+        Two-tier response cache: an in-memory LRU in front of an optional SQLite file.
+
+        :param max_entries: Entries in the in-memory tier.
+        :param db_path: SQLite file for the persistent tier, or None to disable it.
+        :param ttl: Seconds before a persisted entry expires.
+        :param max_rows: Rows kept in the persistent tier.
+        """
+        self.memory = LRUCache(max_entries)
+        self.disk = SQLiteCache(db_path, ttl or config.LLM_CACHE_TTL, max_rows or config.LLM_CACHE_MAX_ROWS) \
+            if db_path else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Looks up several responses, memory tier first, then every memory miss in one disk query.
+
+        :return: Dict of key -> response text for the keys that were found.
+        """
+        return tiered_get_many(keys, self.memory, self.disk, CACHE_REQUESTS)
+
+    def put(self, key: str, value: str):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counts per tier, plus the overall hit ratio."""
+        return tier_stats(CACHE_REQUESTS, self.memory)
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+report_hit_ratio(CACHE_HIT_RATIO, lambda: _cache)
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Returns the process-wide LLM cache, or None when LLM_CACHE_ENABLED is off."""
+    global _cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(config.LLM_CACHE_SIZE, config.LLM_CACHE_DB)
+    return _cache
@@ -1,23 +1,265 @@
-from fastapi import FastAPI
-from format_transcript import format_transcript
-from experience_analyzer import analyze_experience
-from sentiment_analyzer import analyze_sentiment
+import asyncio
+import functools
+import json
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+import config
+from format_transcript import format_transcript, aiter_turns
+from pipeline import (run_analysis_async, run_batch_analysis_async, feed_session_async, finish_session_async,
+                      run_analysis_job, shutdown_executor, limiter, Overloaded)
+from job_queue import JobQueue, JobStore
+from live_session import sessions
+from model_registry import configure_threads, preload_models
+from prompt_index import build_all_indexes, available_roles
+from metrics import REGISTRY
+from tracing import profiled
 
 
-app = FastAPI()
+jobs: Optional[JobQueue] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global jobs
+    configure_threads()
+    # Load the embedding model once per process instead of on every request
+    if config.PRELOAD_MODELS:
+        preload_models()
+        build_all_indexes()
+    # Jobs run on this event loop, so they share the request path's limiter
+    jobs = JobQueue(JobStore(config.JOB_DB), functools.partial(run_analysis_job, loop=asyncio.get_running_loop()),
+                    config.JOB_WORKERS)
+    jobs.start()
+    yield
+    # Off the loop: the job workers need it to finish their current job
+    await run_in_threadpool(jobs.stop)
+    shutdown_executor()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class BatchCandidate(BaseModel):
+    candidate_id: str
+    transcript: str
+    candidate_name: Optional[str] = None
+
+
+class BatchAnalysisRequest(BaseModel):
+    job_description: str
+    role: Optional[str] = None
+    candidates: List[BatchCandidate]
+
+
+class JobRequest(BaseModel):
+    transcript: str
+    job_description: str
+    role: Optional[str] = None
+    candidate: Optional[str] = None
+    callback_url: Optional[str] = None
+
+
+async def run_analysis(formatted_transcript, transcript: str, job_description: str, role: Optional[str] = None,
+                       candidate: Optional[str] = None):
+    if role and role not in available_roles():
+        raise HTTPException(status_code=400, detail=f"Unknown role: {role}")
+
+    try:
+        return await run_analysis_async(formatted_transcript, transcript, job_description, role, candidate)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+def with_profile(result, stages, started: float):
+    """Adds the per-stage timing breakdown to a response when profiling was requested."""
+    if stages is None or not isinstance(result, dict):
+        return result
+    return {**result, "profile": {"stages": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+                                  "total_s": round(time.perf_counter() - started, 4)}}
+
 
 @app.get("/analysis")
-async def analysis(transcript:str,job_description:str):
-    formatted_transcript = format_transcript(transcript)
-    print(formatted_transcript)
+async def analysis(transcript:str,job_description:str,role:Optional[str]=None,candidate:Optional[str]=None,
+                   profile: bool = False):
+    started = time.perf_counter()
+    with profiled(profile) as stages:
+        formatted_transcript = format_transcript(transcript)
+        result = await run_analysis(formatted_transcript, transcript, job_description, role, candidate)
+
+    return with_profile(result, stages, started)
+
+
+@app.post("/analysis")
+async def analysis_from_body(request: Request, job_description: str, role: Optional[str] = None,
+                             candidate: Optional[str] = None, profile: bool = False):
+    """
+    Same as GET /analysis, but the transcript is sent as the raw request body.
+
+    Turns are parsed as the body streams in, so parsing overlaps with the upload instead of
+    waiting for the whole transcript.
+    """
+    raw_chunks = []
+
+    async def body():
+        async for chunk in request.stream():
+            raw_chunks.append(chunk)
+            yield chunk
+
+    started = time.perf_counter()
+    with profiled(profile) as stages:
+        formatted_transcript = [turn async for turn in aiter_turns(body())]
+        transcript = b"".join(raw_chunks).decode("utf-8", errors="replace")
+        result = await run_analysis(formatted_transcript, transcript, job_description, role, candidate)
+
+    return with_profile(result, stages, started)
+
+
+@app.post("/analysis/batch")
+async def batch_analysis(batch: BatchAnalysisRequest):
+    """
+    Analyzes many transcripts against one job description.
+
+    Results are streamed back as NDJSON, one line per candidate, in the order they finish.
+    """
+    if batch.role and batch.role not in available_roles():
+        raise HTTPException(status_code=400, detail=f"Unknown role: {batch.role}")
+    if limiter.pending >= limiter.max_pending:
+        raise HTTPException(status_code=503, detail="Analyzer is busy", headers={"Retry-After": "5"})
+
+    candidates = [(c.candidate_id, format_transcript(c.transcript), c.transcript, c.candidate_name)
+                  for c in batch.candidates]
+
+    async def results():
+        try:
+            # aclosing closes the pipeline generator here, in this task, even when the client disconnects
+            async with aclosing(run_batch_analysis_async(candidates, batch.job_description, batch.role)) as stream:
+                async for result in stream:
+                    yield json.dumps(result) + "\n"
+        except Overloaded as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(job: JobRequest):
+    """
+    Queues an analysis and returns immediately; poll GET /jobs/{job_id} or pass a callback_url.
+
+    Submitting the same transcript and parameters again returns the existing job.
+    """
+    if job.role and job.role not in available_roles():
+        raise HTTPException(status_code=400, detail=f"Unknown role: {job.role}")
+    request = job.model_dump(exclude={"callback_url"})
+    record = await run_in_threadpool(jobs.submit, request, job.callback_url)
+    return {"job_id": record["job_id"], "status": record["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    record = await run_in_threadpool(jobs.store.get, job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return record
+
+
+MISROUTED_SESSION = ("Session belongs to another worker process; live sessions need WORKERS=1 "
+                     "or a proxy that routes every request for a session to the same worker")
+
+
+def _get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        if sessions.owned_elsewhere(session_id):
+            raise HTTPException(status_code=421, detail=MISROUTED_SESSION)
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@app.post("/sessions")
+async def create_session(role: Optional[str] = None, candidate: Optional[str] = None):
+    """Starts analysis for a live interview; send transcript text to it as the interview goes."""
+    if role and role not in available_roles():
+        raise HTTPException(status_code=400, detail=f"Unknown role: {role}")
+    try:
+        session = sessions.create(role=role, candidate=candidate)
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"session_id": session.session_id}
+
+
+@app.post("/sessions/{session_id}/transcript")
+async def append_session_transcript(session_id: str, request: Request):
+    """Appends the raw transcript text in the request body to a live session."""
+    session = _get_session(session_id)
+    text = (await request.body()).decode("utf-8", errors="replace")
+    async with sessions.lock(session_id):
+        try:
+            return await feed_session_async(session, text)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.websocket("/sessions/{session_id}/ws")
+async def session_websocket(websocket: WebSocket, session_id: str):
+    """
+    Streams transcript text to a live session over a WebSocket.
+
+    Every text message is appended to the transcript and answered with the running totals.
+    The socket is closed with code 4409 once the session has been finished, and with 4404 (or
+    4421 if it belongs to another worker process) when the session is not found.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        misrouted = sessions.owned_elsewhere(session_id)
+        await websocket.close(code=4421 if misrouted else 4404, reason=MISROUTED_SESSION if misrouted else "")
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            async with sessions.lock(session_id):
+                status = await feed_session_async(session, text)
+            await websocket.send_json(status)
+    except ValueError as e:
+        await websocket.send_json({"error": str(e)})
+        await websocket.close(code=4409)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/sessions/{session_id}")
+async def session_status(session_id: str):
+    return _get_session(session_id).status()
+
 
-    experience_analysis = analyze_experience(formatted_transcript,job_description)
+@app.post("/sessions/{session_id}/finish")
+async def finish_session(session_id: str, job_description: str):
+    """Ends a live session and returns the same report as /analysis."""
+    session = _get_session(session_id)
+    async with sessions.lock(session_id):
+        try:
+            report = await finish_session_async(session, job_description)
+        except Overloaded as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    sessions.remove(session_id)
+    return report
 
-    sentimental_analysis = analyze_sentiment(transcript)
 
-    return {
-        "experience_analysis": experience_analysis,
-        "sentimental_analysis": sentimental_analysis
-    }
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    _get_session(session_id)
+    sessions.remove(session_id)
+    return {"deleted": session_id}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of the analyzer's counters, gauges and stage histograms."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
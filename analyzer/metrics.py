@@ -0,0 +1,169 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Tuple
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        """
+        Base class for a labelled metric.
+
+        :param name: Metric name in Prometheus format (snake_case, unit suffix).
+        :param documentation: Help text shown next to the metric.
+        """
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Cumulative histogram of observed values, e.g. durations in seconds.
+
+        :param buckets: Upper bounds of the buckets; +Inf is added automatically.
+        """
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._observations: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per label set: one count per bucket, then the sum and the total count
+            state = self._observations.get(key)
+            if state is None:
+                state = self._observations[key] = [0.0] * (len(self.buckets) + 2)
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def value(self, **labels) -> float:
+        """Number of observations for the label set."""
+        with self._lock:
+            state = self._observations.get(self._key(labels))
+            return state[-1] if state else 0.0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._observations.items():
+                labels = dict(key)
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_bound(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, state[-2]))
+                samples.append((f"{self.name}_count", labels, state[-1]))
+        return samples
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def on_collect(self, collector: Callable[[], None]):
+        """Registers a function that refreshes derived metrics (e.g. ratios, queue sizes) before rendering."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every registered metric in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+                    lines.append(f"{name}{{{label_text}}} {value}")
+                else:
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry shared by all analyzer modules
+REGISTRY = Registry()
@@ -0,0 +1,193 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+import config
+from embedding_cache import embedding_key, get_embedding_cache, normalize_text
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "analyzer_model_load_seconds", "Time taken to load an embedding model into memory."
+)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_models: Dict[Tuple[str, Optional[str], str], SentenceTransformer] = {}
+_lock = threading.Lock()
+# Hugging Face fast tokenizers are not thread-safe: a call from a second thread while one is
+# tokenizing fails with "Already borrowed". One lock per loaded model serializes its use.
+_model_locks: Dict[int, threading.Lock] = {}
+
+
+def embedding_threads() -> int:
+    """Intra-op threads per process: EMBEDDING_THREADS, or the cores split evenly across WORKERS."""
+    if config.EMBEDDING_THREADS > 0:
+        return config.EMBEDDING_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, config.WORKERS))
+
+
+def configure_threads():
+    """Sets torch's intra-op thread count for this process; ONNX sessions take theirs when loaded."""
+    import torch
+
+    torch.set_num_threads(embedding_threads())
+
+
+def _onnx_dir(model_name: str) -> str:
+    return os.path.join(config.ONNX_MODEL_DIR, re.sub(r"[^\w\-.]", "_", model_name))
+
+
+def _onnx_file(quantized: bool) -> str:
+    return f"model_int8_{config.ONNX_QUANTIZATION}.onnx" if quantized else "model.onnx"
+
+
+def export_onnx_model(model_name: str = None, quantized: bool = None) -> str:
+    """
+    Exports the model to ONNX under ONNX_MODEL_DIR, plus an int8 dynamically quantized copy.
+
+    Exporting takes a while, so it is done once and reused by every later process; run this
+    ahead of time (or let prefork.prepare_parent do it) to keep it off the first request.
+
+    :param model_name: Name or path of the model. Defaults to EMBEDDING_MODEL_NAME.
+    :param quantized: Also write the int8 model. Defaults to EMBEDDING_BACKEND == "onnx-int8".
+    :return: Directory holding the exported model.
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    quantized = config.EMBEDDING_BACKEND == "onnx-int8" if quantized is None else quantized
+    path = _onnx_dir(model_name)
+
+    if not os.path.exists(os.path.join(path, "onnx", _onnx_file(False))):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        SentenceTransformer(model_name, backend="onnx", device="cpu").save_pretrained(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process finished the export first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        logger.info("Exported %s to ONNX in %s", model_name, path)
+
+    if quantized and not os.path.exists(os.path.join(path, "onnx", _onnx_file(True))):
+        export_dynamic_quantized_onnx_model(SentenceTransformer(path, backend="onnx", device="cpu"),
+                                            config.ONNX_QUANTIZATION, path,
+                                            file_suffix=f"int8_{config.ONNX_QUANTIZATION}")
+        logger.info("Quantized %s to int8 (%s)", model_name, config.ONNX_QUANTIZATION)
+    return path
+
+
+def _load_model(model_name: str, device: Optional[str], backend: str) -> SentenceTransformer:
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device)
+
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = embedding_threads()
+    session_options.inter_op_num_threads = 1
+    quantized = backend == "onnx-int8"
+    return SentenceTransformer(export_onnx_model(model_name, quantized), backend="onnx", device="cpu",
+                               model_kwargs={"file_name": _onnx_file(quantized),
+                                             "session_options": session_options})
+
+
+def get_model(model_name: str = None, device: str = None, backend: str = None) -> SentenceTransformer:
+    """
+    Returns the process-wide SentenceTransformer for the given model, loading it on first use.
+
+    The loaded model is shared by every caller in the process. Use `encode` (or hold
+    `model_lock(model)`) rather than calling the model or its tokenizer directly, so
+    concurrent worker threads take turns.
+
+    :param model_name: Name or path of the model. Defaults to EMBEDDING_MODEL_NAME.
+    :param device: Device to load the model on ("cpu", "cuda", ...). Defaults to EMBEDDING_DEVICE.
+        The ONNX backends always run on CPU.
+    :param backend: "torch", "onnx" or "onnx-int8". Defaults to EMBEDDING_BACKEND.
+    :return: The loaded SentenceTransformer.
+    """
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    device = device or config.EMBEDDING_DEVICE
+    backend = backend or config.EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    key = (model_name, device, backend)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited for the lock
+        model = _models.get(key)
+        if model is None:
+            start = time.perf_counter()
+            model = _load_model(model_name, device, backend)
+            elapsed = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.set(elapsed, model=model_name, backend=backend)
+            logger.info("Loaded embedding model %s (%s) on %s in %.2fs", model_name, backend, model.device, elapsed)
+            _model_locks[id(model)] = threading.Lock()
+            _models[key] = model
+    return model
+
+
+def model_lock(model: SentenceTransformer) -> threading.Lock:
+    """The lock to hold while using a model returned by get_model, or its tokenizer."""
+    return _model_locks[id(model)]
+
+
+def _encode(model: SentenceTransformer, sentences: List[str]) -> np.ndarray:
+    # Torch and ONNX Runtime already spread one batch over the intra-op threads, so taking
+    # turns costs little throughput
+    with model_lock(model):
+        embeddings = model.encode(sentences, batch_size=config.EMBEDDING_BATCH_SIZE, convert_to_numpy=True,
+                                  normalize_embeddings=True)
+    return embeddings.astype(np.float32, copy=False)
+
+
+def encode(sentences: List[str], model_name: str = None, backend: str = None, use_cache: bool = True) -> np.ndarray:
+    """
+    Embeds sentences with the configured backend, in batches of EMBEDDING_BATCH_SIZE.
+
+    Sentences are whitespace-normalized (see embedding_cache.normalize_text) and looked up in the
+    utterance cache first, so only sentences not seen before, and each distinct one only once, go
+    through the model.
+
+    :param sentences: Sentences to embed.
+    :param model_name: Name or path of the model. Defaults to EMBEDDING_MODEL_NAME.
+    :param backend: "torch", "onnx" or "onnx-int8". Defaults to EMBEDDING_BACKEND.
+    :param use_cache: Set to False to always run the model, e.g. when benchmarking it.
+    :return: L2-normalized float32 embeddings, shape (len(sentences), dim).
+    """
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    backend = backend or config.EMBEDDING_BACKEND
+    model = get_model(model_name, backend=backend)
+    # Cache keys are over the normalized text, so both paths embed it; a sentence gets the same
+    # vector whether or not the cache is on
+    texts = [normalize_text(sentence) for sentence in sentences]
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None or not texts:
+        return _encode(model, texts)
+
+    keys = [embedding_key(model_name, backend, text) for text in texts]
+    found = cache.get_many(keys)
+    missing = {key: text for key, text in zip(keys, texts) if key not in found}
+    cache.record_repeats(len(keys) - len(set(keys)))
+    if missing:
+        computed = dict(zip(missing, _encode(model, list(missing.values()))))
+        cache.put_many(computed)
+        found.update(computed)
+    return np.stack([found[key] for key in keys])
+
+
+def preload_models():
+    """Loads the configured embedding model so the first request does not pay for it."""
+    get_model()
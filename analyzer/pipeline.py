@@ -0,0 +1,462 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import config
+from metrics import REGISTRY
+from experience_analyzer import (extract_experience, extract_experience_batch,
+                                 analyze_experience_with_llm_async)
+from format_transcript import format_transcript
+from sentiment_analyzer import analyze_sentiment, analyze_transcript_sentiment
+from live_session import LiveSession
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when the analyzer already has ANALYSIS_MAX_PENDING analyses running or queued."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Worker calls started inside the current limiter slot (see AnalysisLimiter.slot)
+_slot_work: contextvars.ContextVar[Optional[List[Future]]] = contextvars.ContextVar("slot_work", default=None)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool used for CPU-bound stages, creating it on first use.
+
+    Threads rather than processes: the embedding model releases the GIL inside torch and the
+    grammar check waits on the LanguageTool server, and worker threads share the already
+    loaded model instead of each process loading its own copy.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.ANALYSIS_WORKERS, thread_name_prefix="analysis")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def run_in_worker(fn: Callable, *args, timeout: float = None, **kwargs):
+    """
+    Runs a blocking function on the worker pool without blocking the event loop.
+
+    A timeout only stops the wait: a call that already started keeps running on its thread.
+    Inside a limiter slot, the slot stays taken until the call has finished.
+
+    :param fn: The function to call.
+    :param timeout: Seconds to wait before raising asyncio.TimeoutError.
+    :return: The function's return value.
+    """
+    # Copy the context so stage timings recorded in the worker reach the request's profile
+    context = contextvars.copy_context()
+    future = get_executor().submit(context.run, fn, *args, **kwargs)
+    work = _slot_work.get()
+    if work is not None:
+        work.append(future)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+
+class AnalysisLimiter:
+    def __init__(self, max_concurrent: int, max_pending: int):
+        """
+        Caps how many analyses run at once and how many may wait for a slot.
+
+        An analysis keeps its slot until the worker calls it started have finished, even when it
+        stopped waiting for them after a timeout, so the cap also bounds the busy worker threads.
+
+        :param max_concurrent: Analyses allowed to run at the same time.
+        :param max_pending: Running plus waiting analyses; beyond this new ones are rejected.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self._pending = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._draining = set()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @asynccontextmanager
+    async def slot(self, background: bool = False):
+        """
+        Holds one analysis slot for the duration of the block.
+
+        :param background: For queued jobs: wait for a slot instead of raising Overloaded when
+            max_pending is reached, and on exit wait for worker calls that timed out to finish, so
+            a retry never runs alongside the attempt it replaces.
+        :raises Overloaded: If max_pending analyses are already running or waiting.
+        """
+        if self._pending >= self.max_pending and not background:
+            raise Overloaded(f"Analyzer is busy ({self._pending} analyses in progress)")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self._pending += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self._pending -= 1
+            raise
+
+        work: List[Future] = []
+        token = _slot_work.set(work)
+        try:
+            yield
+        finally:
+            try:
+                _slot_work.reset(token)
+            except ValueError:
+                # Closed from another context, e.g. a dropped async generator finalized by the GC;
+                # there is nothing to restore, but the slot must still be released
+                pass
+            if background:
+                running = [asyncio.wrap_future(future) for future in work if not future.done()]
+                try:
+                    if running:
+                        await asyncio.wait(running)
+                finally:
+                    self._release()
+            else:
+                self._release_when_done(work)
+
+    def _release_when_done(self, work: List[Future]):
+        running = [future for future in work if not future.done()]
+        if not running:
+            self._release()
+            return
+        # A timed-out stage still occupies its worker thread; keep the slot until it is done
+        waiter = asyncio.ensure_future(asyncio.wait([asyncio.wrap_future(future) for future in running]))
+        self._draining.add(waiter)
+        waiter.add_done_callback(self._release_drained)
+
+    def _release(self):
+        self._semaphore.release()
+        self._pending -= 1
+
+    def _release_drained(self, waiter: asyncio.Future):
+        self._draining.discard(waiter)
+        self._release()
+
+
+limiter = AnalysisLimiter(config.ANALYSIS_MAX_CONCURRENT, config.ANALYSIS_MAX_PENDING)
+
+ANALYSES_PENDING = REGISTRY.gauge("analyzer_analyses_pending", "Analyses running or waiting for a slot.")
+REGISTRY.on_collect(lambda: ANALYSES_PENDING.set(limiter.pending))
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float):
+        """
+        Spaces out calls so no more than `requests_per_minute` start per minute.
+
+        :param requests_per_minute: Allowed call rate; 0 or less disables limiting.
+        """
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+llm_rate_limiter = RateLimiter(config.LLM_REQUESTS_PER_MINUTE)
+
+
+async def analyze_experience_async(transcript: List[Dict[str, str]], job_description: str, role: str = None) -> Dict:
+    """
+    Runs experience extraction on the worker pool, then awaits the LLM evaluation.
+
+    :param transcript: List of formatted transcript objects.
+    :param job_description: The job description for comparison.
+    :param role: Prompt bank to match against, or None for the default bank.
+    :return: JSON metrics evaluating the candidate's experience, or an error dictionary.
+    """
+    try:
+        extracted_experience, prompt_stats = await run_in_worker(extract_experience, transcript, role=role,
+                                                                 with_stats=True, timeout=config.EXTRACTION_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "Experience extraction timed out."}
+
+    return await evaluate_experience_async(extracted_experience, job_description, prompt_stats)
+
+
+async def evaluate_experience_async(extracted_experience: List[str], job_description: str,
+                                    prompt_stats: Dict[str, int] = None) -> Dict:
+    """
+    Awaits the LLM evaluation of extracted experience, respecting the LLM rate limit and timeout.
+
+    :param extracted_experience: List of experience-related sentences.
+    :param job_description: The job description for comparison.
+    :param prompt_stats: Packing stats from extract_experience, reported with the analysis as prompt_stats.
+    :return: JSON metrics evaluating the candidate's experience, or an error dictionary.
+    """
+    if extracted_experience:
+        await llm_rate_limiter.wait()
+    try:
+        analysis = await asyncio.wait_for(analyze_experience_with_llm_async(extracted_experience, job_description),
+                                          config.LLM_TIMEOUT)
+    except asyncio.TimeoutError:
+        analysis = {"error": "LLM evaluation timed out."}
+    return with_prompt_stats(analysis, prompt_stats)
+
+
+def with_prompt_stats(analysis: Dict, prompt_stats: Optional[Dict[str, int]]) -> Dict:
+    """Adds the per-request prompt packing stats (tokens sent and saved) to an experience analysis."""
+    if prompt_stats is None:
+        return analysis
+    return {**analysis, "prompt_stats": prompt_stats}
+
+
+async def analyze_sentiment_async(text: str, transcript: List[Dict[str, str]] = None, candidate: str = None) -> Dict:
+    """
+    Runs sentiment, filler-word and grammar analysis on the worker pool.
+
+    :param text: The raw transcript text, analyzed as a whole when no turns could be parsed.
+    :param transcript: Formatted transcript; when given, only the candidate's turns are scored.
+    :param candidate: The candidate's name, if known.
+    :return: Sentiment analysis dictionary, or an error dictionary.
+    """
+    try:
+        if transcript:
+            return await run_in_worker(analyze_transcript_sentiment, transcript, candidate,
+                                       timeout=config.SENTIMENT_TIMEOUT)
+        return await run_in_worker(analyze_sentiment, text, timeout=config.SENTIMENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "Sentiment analysis timed out."}
+
+
+async def run_analysis_async(formatted_transcript: List[Dict[str, str]], transcript: str,
+                             job_description: str, role: str = None, candidate: str = None) -> Dict:
+    """
+    Runs the experience and sentiment branches concurrently.
+
+    :param formatted_transcript: List of formatted transcript objects.
+    :param transcript: The raw transcript text.
+    :param job_description: The job description for comparison.
+    :param role: Prompt bank to match against, or None for the default bank.
+    :param candidate: The candidate's name, if known.
+    :return: Dictionary with experience_analysis and sentimental_analysis.
+    """
+    async with limiter.slot():
+        experience_analysis, sentimental_analysis = await asyncio.gather(
+            analyze_experience_async(formatted_transcript, job_description, role),
+            analyze_sentiment_async(transcript, formatted_transcript, candidate),
+        )
+
+    return {
+        "experience_analysis": experience_analysis,
+        "sentimental_analysis": sentimental_analysis
+    }
+
+
+async def run_batch_analysis_async(candidates: List[Tuple[str, List[Dict[str, str]], str, Optional[str]]],
+                                   job_description: str, role: str = None) -> AsyncIterator[Dict]:
+    """
+    Analyzes a batch of candidates against one job description, yielding each result as it finishes.
+
+    Every utterance of every transcript is embedded in one batched encode call; the LLM and
+    sentiment work then fans out per candidate, with at most BATCH_LLM_CONCURRENCY candidates
+    evaluated at once.
+
+    :param candidates: List of (candidate_id, formatted transcript, raw transcript, candidate name) tuples.
+    :param job_description: The job description shared by the batch.
+    :param role: Prompt bank to match against, or None for the default bank.
+    :return: Async iterator of {"candidate_id", "experience_analysis", "sentimental_analysis"} dicts.
+    """
+    async with limiter.slot():
+        try:
+            extracted = await run_in_worker(extract_experience_batch, [c[1] for c in candidates], role=role,
+                                            timeout=config.EXTRACTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            extracted = None
+
+        semaphore = asyncio.Semaphore(config.BATCH_LLM_CONCURRENCY)
+
+        async def extraction_timed_out() -> Dict:
+            return {"error": "Experience extraction timed out."}
+
+        async def analyze_candidate(index: int) -> Dict:
+            candidate_id, formatted_transcript, transcript, candidate = candidates[index]
+            try:
+                async with semaphore:
+                    if extracted is None:
+                        experience = extraction_timed_out()
+                    else:
+                        experience = evaluate_experience_async(extracted[index][0], job_description, extracted[index][1])
+                    experience_analysis, sentimental_analysis = await asyncio.gather(
+                        experience, analyze_sentiment_async(transcript, formatted_transcript, candidate)
+                    )
+            except Exception as e:
+                # One candidate failing (e.g. the LLM API rejecting its request) must not end the stream
+                logger.exception("Batch analysis failed for candidate %s", candidate_id)
+                return {"candidate_id": candidate_id, "error": f"Analysis failed: {e}"}
+            return {
+                "candidate_id": candidate_id,
+                "experience_analysis": experience_analysis,
+                "sentimental_analysis": sentimental_analysis
+            }
+
+        tasks = [asyncio.create_task(analyze_candidate(i)) for i in range(len(candidates))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def feed_session_async(session: LiveSession, text: str) -> Dict:
+    """
+    Feeds live transcript text to a session on the worker pool.
+
+    :param session: The live session.
+    :param text: The next piece of raw transcript.
+    :return: The session's running totals, with an "error" key if processing timed out.
+    :raises ValueError: If the session is already finished.
+    """
+    session.queue(text)
+    try:
+        await run_in_worker(session.drain, timeout=config.EXTRACTION_TIMEOUT)
+    except asyncio.TimeoutError:
+        # The text stays queued or in progress on the worker and is counted once it is processed
+        return {**session.status(), "error": "Transcript processing timed out; the text will still be added."}
+    return session.status()
+
+
+async def finish_session_async(session: LiveSession, job_description: str) -> Dict:
+    """
+    Completes a live session: flushes the last turn and runs the LLM evaluation.
+
+    Everything else was computed while the interview was running.
+
+    :param session: The live session.
+    :param job_description: The job description for comparison.
+    :return: Dictionary with experience_analysis and sentimental_analysis.
+    """
+    async with limiter.slot():
+        experience_analysis, sentimental_analysis = await asyncio.gather(
+            _session_experience_async(session, job_description),
+            _session_sentiment_async(session),
+        )
+
+    return {
+        "experience_analysis": experience_analysis,
+        "sentimental_analysis": sentimental_analysis
+    }
+
+
+async def _session_experience_async(session: LiveSession, job_description: str) -> Dict:
+    try:
+        await run_in_worker(session.close, timeout=config.EXTRACTION_TIMEOUT)
+        extracted_experience, prompt_stats = await run_in_worker(session.extracted_experience, with_stats=True,
+                                                                 timeout=config.EXTRACTION_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "Experience extraction timed out."}
+    return await evaluate_experience_async(extracted_experience, job_description, prompt_stats)
+
+
+async def _session_sentiment_async(session: LiveSession) -> Dict:
+    try:
+        return await run_in_worker(session.report, timeout=config.SENTIMENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "Sentiment analysis timed out."}
+
+
+async def _job_stage(awaitable, timeout: float, name: str):
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{name} timed out after {timeout:g}s")
+
+
+async def _job_experience_async(formatted_transcript: List[Dict[str, str]], job_description: str,
+                                role: str = None) -> Dict:
+    extracted_experience, prompt_stats = await _job_stage(
+        run_in_worker(extract_experience, formatted_transcript, role=role, with_stats=True),
+        config.EXTRACTION_TIMEOUT, "Experience extraction")
+    if extracted_experience:
+        await llm_rate_limiter.wait()
+    analysis = await _job_stage(analyze_experience_with_llm_async(extracted_experience, job_description),
+                                config.LLM_TIMEOUT, "LLM evaluation")
+    return with_prompt_stats(analysis, prompt_stats)
+
+
+async def run_analysis_job_async(formatted_transcript: List[Dict[str, str]], transcript: str,
+                                 job_description: str, role: str = None, candidate: str = None) -> Dict:
+    """
+    Runs a queued analysis like run_analysis_async, in a background limiter slot.
+
+    Stage timeouts and LLM errors are raised instead of being reported in the result, so the job
+    queue can retry the job. The slot, and so the job attempt, lasts until every worker call it
+    started has finished.
+
+    :param formatted_transcript: List of formatted transcript objects.
+    :param transcript: The raw transcript text.
+    :param job_description: The job description for comparison.
+    :param role: Prompt bank to match against, or None for the default bank.
+    :param candidate: The candidate's name, if known.
+    :return: Dictionary with experience_analysis and sentimental_analysis.
+    """
+    async with limiter.slot(background=True):
+        if formatted_transcript:
+            sentiment = run_in_worker(analyze_transcript_sentiment, formatted_transcript, candidate)
+        else:
+            sentiment = run_in_worker(analyze_sentiment, transcript)
+        # Let both branches finish before raising, so neither outlives the slot
+        experience_analysis, sentimental_analysis = await asyncio.gather(
+            _job_experience_async(formatted_transcript, job_description, role),
+            _job_stage(sentiment, config.SENTIMENT_TIMEOUT, "Sentiment analysis"),
+            return_exceptions=True
+        )
+    for outcome in (experience_analysis, sentimental_analysis):
+        if isinstance(outcome, BaseException):
+            raise outcome
+
+    return {
+        "experience_analysis": experience_analysis,
+        "sentimental_analysis": sentimental_analysis
+    }
+
+
+def run_analysis_job(request: Dict, loop: asyncio.AbstractEventLoop) -> Dict:
+    """
+    Runs a full analysis for the job queue, whose worker threads call it (see job_queue).
+
+    The analysis runs on the server's event loop through run_analysis_job_async, so jobs share
+    the request path's limiter and run the experience and sentiment branches concurrently; the
+    calling thread blocks until it is done.
+
+    :param request: Dict with transcript, job_description and optional role and candidate.
+    :param loop: The server's event loop.
+    :return: Dictionary with experience_analysis and sentimental_analysis.
+    """
+    transcript = request["transcript"]
+    formatted_transcript = format_transcript(transcript)
+    return asyncio.run_coroutine_threadsafe(
+        run_analysis_job_async(formatted_transcript, transcript, request["job_description"], request.get("role"),
+                               request.get("candidate")),
+        loop
+    ).result()
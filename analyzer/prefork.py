@@ -0,0 +1,84 @@
+import gc
+import logging
+import os
+import subprocess
+import sys
+from typing import Optional
+
+import torch
+
+import config
+from model_registry import export_onnx_model, preload_models
+from prompt_index import build_all_indexes
+
+logger = logging.getLogger(__name__)
+
+_grammar_server: Optional[subprocess.Popen] = None
+
+
+def start_grammar_server() -> str:
+    """
+    Starts the shared LanguageTool server in a helper process and points this process at it.
+
+    The server is started in its own interpreter rather than in the parent, so forked workers
+    never inherit a handle that would shut the JVM down when they exit.
+
+    :return: Base URL of the server.
+    """
+    global _grammar_server
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languagetool_server.py")
+    _grammar_server = subprocess.Popen([sys.executable, script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       text=True)
+    url = _grammar_server.stdout.readline().strip()
+    if not url:
+        raise RuntimeError(f"LanguageTool server exited with code {_grammar_server.wait()}")
+    # Workers read config.LANGUAGETOOL_URL on first use, after the fork
+    config.LANGUAGETOOL_URL = url
+    os.environ["LANGUAGETOOL_URL"] = url
+    logger.info("Shared LanguageTool server at %s", url)
+    return url
+
+
+def stop_grammar_server():
+    """Stops the helper started by start_grammar_server, if any."""
+    global _grammar_server
+    if _grammar_server is not None:
+        # Closing stdin lets the helper shut LanguageTool down cleanly
+        _grammar_server.stdin.close()
+        try:
+            _grammar_server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _grammar_server.kill()
+        _grammar_server = None
+
+
+def prepare_parent(workers: int):
+    """
+    Loads everything the workers share before they are forked.
+
+    The embedding model and prompt indexes are loaded once here; forked workers then share
+    those pages copy-on-write instead of each holding their own copy. Torch is limited to one
+    thread first, so no OpenMP thread pool exists at fork time (a pool inherited across fork
+    can deadlock the child); each worker takes its share of the cores in the app lifespan.
+    gc.freeze keeps the collector from touching, and so copying, the preloaded objects in
+    every worker.
+
+    :param workers: Number of worker processes that will be forked.
+    """
+    # Workers inherit this and split the cores between them
+    config.WORKERS = workers
+    if workers > 1:
+        logger.warning("Running %d workers: live sessions stay in the worker that created them, so they "
+                       "need WORKERS=1 or a proxy that routes on the session id", workers)
+    torch.set_num_threads(1)
+    if not config.LANGUAGETOOL_URL:
+        start_grammar_server()
+    if config.EMBEDDING_BACKEND == "torch":
+        preload_models()
+        build_all_indexes()
+    else:
+        # An ONNX Runtime session's thread pool does not survive fork, so each worker loads its
+        # own (small) session; only the one-off export happens here
+        export_onnx_model()
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,133 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from metrics import REGISTRY
+from tracing import span
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; the embedding model's tokenizer is used instead
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENS_SAVED = REGISTRY.counter("analyzer_prompt_tokens_saved_total",
+                                       "Experience tokens left out of LLM prompts by deduplication and the token budget.")
+PROMPT_TOKENS_SENT = REGISTRY.counter("analyzer_prompt_tokens_sent_total",
+                                      "Experience tokens included in LLM prompts.")
+
+_token_counter: Optional[Callable[[str], int]] = None
+_token_counter_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens locally, without calling the LLM API.
+
+    Uses tiktoken (PROMPT_TOKENIZER) when it is installed, otherwise the tokenizer of the
+    already loaded embedding model. Either is a close stand-in for the LLM's own tokenizer.
+
+    :param text: The text to count.
+    :return: Number of tokens.
+    """
+    global _token_counter
+    if _token_counter is None:
+        with _token_counter_lock:
+            if _token_counter is None:
+                if tiktoken is not None:
+                    encoding = tiktoken.get_encoding(config.PROMPT_TOKENIZER)
+                    _token_counter = lambda s: len(encoding.encode(s, disallowed_special=()))
+                else:
+                    from model_registry import get_model, model_lock
+                    model = get_model()
+
+                    def count_with_model(s: str) -> int:
+                        # The tokenizer is shared with encode, which may be running on another thread
+                        with model_lock(model):
+                            return len(model.tokenizer.tokenize(s))
+
+                    _token_counter = count_with_model
+    return _token_counter(text)
+
+
+def _window_max(scores: np.ndarray, margin: int) -> np.ndarray:
+    # Each sentence's best score within +/-margin, so context sentences rank with their match
+    n = len(scores)
+    if n == 0:
+        return scores
+    padded = np.pad(scores, margin, constant_values=-np.inf) if margin > 0 else scores
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * max(margin, 0) + 1)
+    return windows.max(axis=1)[:n]
+
+
+def pack_stats(sentences_extracted: int = 0, sentences_sent: int = 0, duplicates_dropped: int = 0,
+               over_budget_dropped: int = 0, tokens_extracted: int = 0, tokens_sent: int = 0) -> Dict[str, int]:
+    """Per-request packing stats, as returned by pack_experience; all zero when nothing was extracted."""
+    return {
+        "sentences_extracted": sentences_extracted,
+        "sentences_sent": sentences_sent,
+        "duplicates_dropped": duplicates_dropped,
+        "over_budget_dropped": over_budget_dropped,
+        "tokens_extracted": tokens_extracted,
+        "tokens_sent": tokens_sent,
+        "tokens_saved": tokens_extracted - tokens_sent
+    }
+
+
+def pack_experience(sentences: List[str], scores: np.ndarray, embeddings: np.ndarray, keep: np.ndarray,
+                    margin: int = 1, token_budget: int = None,
+                    dedupe_threshold: float = None) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Chooses which extracted sentences go into the LLM prompt.
+
+    Kept sentences are ranked by relevance (their own or their matched neighbour's similarity),
+    near-duplicates of an already chosen sentence are dropped, and sentences are added until
+    the token budget is used up. The chosen sentences are returned in transcript order.
+
+    :param sentences: All sentences of the transcript.
+    :param scores: Per-sentence max similarity to the prompt bank.
+    :param embeddings: Normalized sentence embeddings, one row per sentence.
+    :param keep: Boolean mask of the sentences extract_experience selected.
+    :param margin: Context margin used when selecting, for ranking context sentences.
+    :param token_budget: Maximum tokens of experience text. Defaults to PROMPT_TOKEN_BUDGET; 0 disables the budget.
+    :param dedupe_threshold: Cosine similarity above which a sentence is a duplicate. Defaults to PROMPT_DEDUPE_THRESHOLD.
+    :return: Tuple of (chosen sentences, stats with tokens_extracted, tokens_sent, tokens_saved and sentence counts).
+    """
+    with span("prompt_pack"):
+        return _pack(sentences, scores, embeddings, keep, margin,
+                     config.PROMPT_TOKEN_BUDGET if token_budget is None else token_budget,
+                     config.PROMPT_DEDUPE_THRESHOLD if dedupe_threshold is None else dedupe_threshold)
+
+
+def _pack(sentences: List[str], scores: np.ndarray, embeddings: np.ndarray, keep: np.ndarray, margin: int,
+          token_budget: int, dedupe_threshold: float) -> Tuple[List[str], Dict[str, int]]:
+    candidates = np.flatnonzero(keep)
+    if len(candidates) == 0:
+        return [], pack_stats()
+    ranks = _window_max(np.asarray(scores, dtype=np.float32), margin)[candidates]
+    order = candidates[np.argsort(-ranks, kind="stable")]
+
+    token_counts = {i: count_tokens(sentences[i]) for i in candidates}
+    chosen: List[int] = []
+    used = duplicates = over_budget = 0
+    for i in order:
+        if chosen and float((embeddings[chosen] @ embeddings[i]).max()) >= dedupe_threshold:
+            duplicates += 1
+            continue
+        if token_budget and used + token_counts[i] > token_budget:
+            over_budget += 1
+            continue
+        chosen.append(i)
+        used += token_counts[i]
+
+    extracted = sum(token_counts.values())
+    stats = pack_stats(len(candidates), len(chosen), duplicates, over_budget, extracted, used)
+    PROMPT_TOKENS_SENT.inc(used)
+    PROMPT_TOKENS_SAVED.inc(extracted - used)
+    logger.debug("Packed experience prompt: %s", stats)
+
+    return [sentences[i] for i in sorted(chosen)], stats
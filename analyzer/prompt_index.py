@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import config
+from model_registry import encode
+
+logger = logging.getLogger(__name__)
+
+# Statements a candidate typically uses when describing their experience
+DEFAULT_PROMPT_BANK = [
+    "I worked at", "I have experience in", "Previously, I was at", "Before that, I worked at",
+    "My previous company was", "I have been working as", "My last role was at", "I was employed at",
+    "I started my career at", "Currently, I am working at",
+    "I was responsible for", "My role involved", "I have been handling", "My work includes",
+    "I specialize in", "I contribute to", "I manage", "I lead a team for", "I developed",
+    "I did an internship at", "I was an intern at", "I worked as a freelancer for",
+    "I contributed to a project at", "I was a consultant for", "I had a contract role at",
+    "I have X years of experience in", "With X years of experience in",
+    "For the past X years, I have worked on", "Over the last X years, I have been involved in",
+    "I bring X years of experience in"
+]
+
+_indexes: Dict[Tuple[str, str], np.ndarray] = {}
+_lock = threading.Lock()
+
+
+def load_prompt_bank(role: str = None) -> List[str]:
+    """
+    Returns the prompts for a role: the default bank plus the role's own prompts, if any.
+
+    :param role: Name of a `<role>.json` file in PROMPT_BANK_DIR, or None for the default bank.
+    :return: List of prompt strings.
+    """
+    if not role:
+        return list(DEFAULT_PROMPT_BANK)
+
+    if not re.fullmatch(r"[\w\-]+", role):
+        raise ValueError(f"Invalid role name: {role!r}")
+
+    path = os.path.join(config.PROMPT_BANK_DIR, f"{role}.json")
+    if not os.path.exists(path):
+        raise ValueError(f"No prompt bank found for role {role!r}")
+
+    with open(path, encoding="utf-8") as f:
+        role_prompts = json.load(f)
+
+    prompts = list(DEFAULT_PROMPT_BANK)
+    prompts.extend(p for p in role_prompts if p not in prompts)
+    return prompts
+
+
+def _prompt_set_hash(prompts: List[str]) -> str:
+    return hashlib.sha256(json.dumps(prompts, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def _index_path(model_name: str, prompts: List[str]) -> str:
+    safe_model = re.sub(r"[^\w\-.]", "_", model_name)
+    if config.EMBEDDING_BACKEND != "torch":
+        # Prompts are embedded with the same backend as the sentences they are compared to
+        safe_model = f"{safe_model}-{config.EMBEDDING_BACKEND}"
+    return os.path.join(config.PROMPT_INDEX_DIR, f"{safe_model}-{_prompt_set_hash(prompts)}.npy")
+
+
+def _build_index(model_name: str, prompts: List[str], path: str):
+    # The index file is the cache for prompts; keeping them out of the utterance cache also
+    # means building indexes before a fork opens no SQLite connection for the workers to inherit
+    embeddings = encode(prompts, model_name, use_cache=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see a partial index
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, embeddings.astype(np.float32))
+    os.replace(tmp_path, path)
+    logger.info("Built prompt index %s (%d prompts)", path, len(prompts))
+
+
+def get_prompt_embeddings(role: str = None, model_name: str = None) -> np.ndarray:
+    """
+    Returns the L2-normalized prompt embedding matrix for a role, shape (n_prompts, dim).
+
+    The matrix is memory-mapped from PROMPT_INDEX_DIR, where it is keyed by model name and a
+    hash of the prompt list, so editing a prompt bank automatically triggers a rebuild.
+
+    :param role: Prompt bank to use, or None for the default bank.
+    :param model_name: Embedding model. Defaults to EMBEDDING_MODEL_NAME.
+    :return: Read-only float32 matrix of prompt embeddings.
+    """
+    model_name = model_name or config.EMBEDDING_MODEL_NAME
+    key = (model_name, role or "")
+
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            prompts = load_prompt_bank(role)
+            path = _index_path(model_name, prompts)
+            if not os.path.exists(path):
+                _build_index(model_name, prompts, path)
+            index = np.load(path, mmap_mode="r")
+            _indexes[key] = index
+    return index
+
+
+def available_roles() -> List[str]:
+    """Lists the roles that have a prompt bank in PROMPT_BANK_DIR."""
+    if not os.path.isdir(config.PROMPT_BANK_DIR):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(config.PROMPT_BANK_DIR) if name.endswith(".json"))
+
+
+def build_all_indexes(model_name: str = None):
+    """Builds (or loads) the prompt index for the default bank and every role bank."""
+    get_prompt_embeddings(None, model_name)
+    for role in available_roles():
+        get_prompt_embeddings(role, model_name)
+
+
+# Build every index ahead of time so requests never pay for encoding prompts
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build_all_indexes()
+    print("Roles:", ", ".join(["default"] + available_roles()))
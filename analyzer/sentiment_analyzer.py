@@ -1,15 +1,24 @@
 import re
 import json
-import language_tool_python
+import numpy as np
+from functools import lru_cache
 from textblob import TextBlob
 from typing import Dict, List
 from collections import Counter
-
-# Initialize LanguageTool for grammar checking
-grammar_tool = language_tool_python.LanguageTool('en-US')
+from grammar_service import check_chunks, check_text
+from tokenizer import PhraseMatcher
+from tracing import span
 
 # Common filler words to track
 FILLER_WORDS = {"uh", "um", "like", "you know", "actually", "basically", "literally", "so", "right"}
+_filler_matcher = PhraseMatcher(FILLER_WORDS)
+
+
+@lru_cache(maxsize=4096)
+def _blob(text: str) -> TextBlob:
+    # TextBlob caches its sentiment on the object, so repeated utterances are only scored once
+    return TextBlob(text)
+
 
 def count_filler_words(text: str) -> Dict[str, int]:
     """
@@ -18,9 +27,20 @@ def count_filler_words(text: str) -> Dict[str, int]:
     :param text: The transcript to analyze.
     :return: Dictionary with filler word counts.
     """
-    word_list = text.lower().split()
-    filler_count = {word: word_list.count(word) for word in FILLER_WORDS if word in word_list}
-    return filler_count
+    return dict(_filler_matcher.count(text))
+
+
+def count_filler_words_by_speaker(transcript: List[Dict[str, str]]) -> Dict[str, Dict[str, int]]:
+    """
+    Count occurrences of filler words separately for each speaker.
+
+    :param transcript: List of formatted transcript objects [{"user": "Name", "content": "Message"}]
+    :return: Dictionary of speaker -> filler word counts.
+    """
+    counts: Dict[str, Counter] = {}
+    for entry in transcript:
+        counts.setdefault(entry["user"], Counter()).update(_filler_matcher.count(entry["content"]))
+    return {speaker: dict(speaker_counts) for speaker, speaker_counts in counts.items()}
 
 def get_polarity_score(text: str) -> float:
     """
@@ -29,7 +49,7 @@ def get_polarity_score(text: str) -> float:
     :param text: The transcript to analyze.
     :return: Polarity score.
     """
-    return TextBlob(text).sentiment.polarity
+    return _blob(text).sentiment.polarity
 
 def detect_grammar_mistakes(text: str) -> List[str]:
     """
@@ -38,35 +58,19 @@ def detect_grammar_mistakes(text: str) -> List[str]:
     :param text: The transcript to analyze.
     :return: List of grammar mistakes.
     """
-    matches = grammar_tool.check(text)
-    return [match.message for match in matches]
+    return check_text(text)
 
 
-def analyze_sentiment(text: str) -> Dict:
-    """
-    Analyzes the given text for sentiment, grammar, and filler words.
-    
-    :param text: The transcript or speech text.
-    :return: A dictionary containing sentiment analysis, filler words, grammar mistakes, and an overall score.
-    """
-    if not text.strip():
-        return {"error": "Empty text provided."}
-    
-    # 1️⃣ Detect Filler Words
-    words = text.lower().split()
-    filler_counts = Counter(word for word in words if word in FILLER_WORDS)
-    total_words = len(words)
-    filler_percentage = round((sum(filler_counts.values()) / total_words) * 100, 2) if total_words > 0 else 0
+_IGNORED_GRAMMAR_MESSAGES = re.compile(r"whitespace|consecutive spaces|too many spaces|extra space")
 
-    # 2️⃣ Calculate Polarity Score
-    polarity_score = round(TextBlob(text).sentiment.polarity, 3)
 
-    # 3️⃣ Grammar Checking (Strict Filtering)
-    matches = grammar_tool.check(text)
+def _build_report(filler_counts: Dict[str, int], total_words: int, polarity_score: float,
+                  grammar_messages: List[str]) -> Dict:
+    filler_percentage = round((sum(filler_counts.values()) / total_words) * 100, 2) if total_words > 0 else 0
 
     grammar_mistakes = list(set(  # Remove duplicates
-        match.message for match in matches
-        if not re.search(r"whitespace|consecutive spaces|too many spaces|extra space", match.message.lower())
+        message for message in grammar_messages
+        if not _IGNORED_GRAMMAR_MESSAGES.search(message.lower())
     ))
     
     grammar_accuracy = round(100 - (len(grammar_mistakes) / total_words * 100), 2) if total_words > 0 else 100
@@ -78,8 +82,7 @@ def analyze_sentiment(text: str) -> Dict:
         (0.2 * (100 - filler_percentage)), 2  # Filler words reduce score
     )
 
-    # Final Output
-    analysis = {
+    return {
         "filler_words": dict(filler_counts),
         "filler_word_percentage": filler_percentage,
         "polarity_score": polarity_score,
@@ -88,8 +91,203 @@ def analyze_sentiment(text: str) -> Dict:
         "grammar_accuracy": grammar_accuracy,
         "overall_score": overall_score
     }
+
+
+def analyze_sentiment(text: str) -> Dict:
+    """
+    Analyzes the given text for sentiment, grammar, and filler words.
     
-    return analysis
+    :param text: The transcript or speech text.
+    :return: A dictionary containing sentiment analysis, filler words, grammar mistakes, and an overall score.
+    """
+    if not text.strip():
+        return {"error": "Empty text provided."}
+    
+    # 1️⃣ Detect Filler Words, counting words in the same pass
+    total_words, filler_counts = _filler_matcher.scan(text)
+
+    # 2️⃣ Calculate Polarity Score
+    with span("textblob"):
+        polarity_score = round(_blob(text).sentiment.polarity, 3)
+
+    # 3️⃣ Grammar Checking (Strict Filtering), per sentence in parallel
+    messages = check_text(text)
+
+    return _build_report(filler_counts, total_words, polarity_score, messages)
+
+
+def identify_candidate(transcript: List[Dict[str, str]], candidate: str = None) -> str:
+    """
+    Works out which speaker in the transcript is the candidate.
+
+    :param transcript: List of formatted transcript objects [{"user": "Name", "content": "Message"}]
+    :param candidate: The candidate's name, if known. Used when it matches a speaker.
+    :return: The candidate's speaker name.
+    """
+    speakers = list(dict.fromkeys(entry["user"] for entry in transcript))
+    if candidate:
+        for speaker in speakers:
+            if speaker.lower() == candidate.strip().lower():
+                return speaker
+    if len(speakers) == 1:
+        return speakers[0]
+
+    # The interviewer opens the interview; of the others, the candidate is whoever talks the most
+    words = Counter()
+    for entry in transcript:
+        if entry["user"] != speakers[0]:
+            words[entry["user"]] += len(entry["content"].split())
+    return words.most_common(1)[0][0]
+
+
+class TranscriptSentiment:
+    def __init__(self, candidate: str = None):
+        """
+        Incrementally accumulates sentiment, grammar, and filler-word statistics over transcript turns.
+
+        Turns can be added as they arrive; every turn is tokenized for per-speaker filler counts,
+        while polarity and grammar are only computed for turns that look like the candidate's
+        (the named candidate, or anyone but the opening speaker when no name is given).
+
+        :param candidate: The candidate's name, if known.
+        """
+        self.candidate = candidate.strip().lower() if candidate else None
+        self.turns: List[Dict] = []
+        self._first_speaker: str = None
+
+    def _likely_candidate(self, speaker: str) -> bool:
+        if self.candidate:
+            return speaker.lower() == self.candidate
+        return speaker != self._first_speaker
+
+    def add_turns(self, transcript: List[Dict[str, str]]):
+        """
+        Adds turns to the running totals.
+
+        :param transcript: New formatted transcript objects [{"user": "Name", "content": "Message"}]
+        """
+        new_turns = []
+        for entry in transcript:
+            if self._first_speaker is None:
+                self._first_speaker = entry["user"]
+            words, fillers = _filler_matcher.scan(entry["content"])
+            turn = {
+                "index": len(self.turns),
+                "user": entry["user"],
+                "content": entry["content"],
+                "words": words,
+                "fillers": fillers,
+                "polarity": None,
+                "grammar": None
+            }
+            self.turns.append(turn)
+            if words and self._likely_candidate(entry["user"]):
+                new_turns.append(turn)
+        self._score(new_turns)
+
+    @staticmethod
+    def _score(turns: List[Dict]):
+        if not turns:
+            return
+        grammar = check_chunks([turn["content"] for turn in turns])
+        with span("textblob"):
+            for turn, messages in zip(turns, grammar):
+                turn["polarity"] = _blob(turn["content"]).sentiment.polarity
+                turn["grammar"] = messages
+
+    def resolve_candidate(self) -> str:
+        """Returns the candidate's speaker name given the turns seen so far."""
+        return identify_candidate(self.turns, self.candidate)
+
+    def summary(self) -> Dict:
+        """
+        Cheap running totals for the turns seen so far, without resolving missing scores.
+
+        :return: Dictionary with turn, word, filler, grammar and polarity totals over scored turns.
+        """
+        scored = [turn for turn in self.turns if turn["polarity"] is not None]
+        words = sum(turn["words"] for turn in scored)
+        return {
+            "turns": len(self.turns),
+            "scored_turns": len(scored),
+            "scored_words": words,
+            "filler_words": sum(sum(turn["fillers"].values()) for turn in scored),
+            "grammar_mistakes": sum(len(turn["grammar"]) for turn in scored),
+            "polarity_score": round(sum(turn["polarity"] * turn["words"] for turn in scored) / words, 3)
+            if words else 0.0
+        }
+
+    def report(self) -> Dict:
+        """
+        Builds the final sentiment report for the candidate.
+
+        :return: The analyze_sentiment dictionary plus "candidate", "speakers" and a per-turn "timeline".
+        """
+        if not any(turn["words"] for turn in self.turns):
+            return {"error": "Empty text provided."}
+
+        candidate = self.resolve_candidate()
+        candidate_turns = [turn for turn in self.turns if turn["user"] == candidate and turn["words"]]
+        if not candidate_turns:
+            return {"error": f"No speech found for candidate {candidate}."}
+        # Fill in candidate turns the running pass skipped because the candidate wasn't known yet
+        self._score([turn for turn in candidate_turns if turn["polarity"] is None])
+
+        speakers: Dict[str, Dict] = {}
+        for turn in self.turns:
+            stats = speakers.setdefault(turn["user"], {"turns": 0, "words": 0, "filler_words": Counter()})
+            stats["turns"] += 1
+            stats["words"] += turn["words"]
+            stats["filler_words"].update(turn["fillers"])
+
+        word_counts = np.array([turn["words"] for turn in candidate_turns], dtype=np.float64)
+        polarities = np.array([turn["polarity"] for turn in candidate_turns], dtype=np.float64)
+
+        polarity_score = round(float(np.average(polarities, weights=word_counts)), 3)
+        analysis = _build_report(speakers[candidate]["filler_words"], int(word_counts.sum()), polarity_score,
+                                 [message for turn in candidate_turns for message in turn["grammar"]])
+
+        analysis["candidate"] = candidate
+        analysis["filler_words_by_speaker"] = {speaker: dict(stats["filler_words"]) for speaker, stats in speakers.items()}
+        analysis["speakers"] = {
+            speaker: {
+                "role": "candidate" if speaker == candidate else "interviewer",
+                "turns": stats["turns"],
+                "words": stats["words"],
+                "filler_words": sum(stats["filler_words"].values())
+            }
+            for speaker, stats in speakers.items()
+        }
+        analysis["timeline"] = [
+            {
+                "turn": turn["index"],
+                "words": turn["words"],
+                "polarity": round(turn["polarity"], 3),
+                "filler_words": sum(turn["fillers"].values()),
+                "grammar_mistakes": len(turn["grammar"])
+            }
+            for turn in candidate_turns
+        ]
+        return analysis
+
+
+def analyze_transcript_sentiment(transcript: List[Dict[str, str]], candidate: str = None) -> Dict:
+    """
+    Analyzes sentiment, grammar, and filler words for the candidate's utterances only.
+
+    Each candidate turn is scored on its own; the overall polarity is the word-weighted mean of
+    the turn polarities. Other speakers are only tokenized for their per-speaker filler counts.
+
+    :param transcript: List of formatted transcript objects [{"user": "Name", "content": "Message"}]
+    :param candidate: The candidate's name, if known; otherwise it is inferred (see identify_candidate).
+    :return: The analyze_sentiment dictionary plus "candidate", "speakers" and a per-turn "timeline".
+    """
+    if not transcript:
+        return {"error": "Empty text provided."}
+
+    sentiment = TranscriptSentiment(identify_candidate(transcript, candidate))
+    sentiment.add_turns(transcript)
+    return sentiment.report()
 
 
 # Example 
@@ -0,0 +1,82 @@
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+# Words, keeping inner apostrophes ("don't", "I’m") but dropping surrounding punctuation
+_TOKEN = re.compile(r"\w+(?:['’]\w+)*")
+# Between the words of a phrase: any run of non-word characters except an apostrophe inside a
+# word, which tokenize() keeps ("you'know" is one token, not "you know")
+_SEPARATOR = r"(?:(?!(?<=\w)['’]\w)\W)+"
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase word tokens in a single pass.
+
+    :param text: The text to tokenize.
+    :return: List of tokens with punctuation stripped.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def _phrase_pattern(phrase: str) -> str:
+    # The left word boundary is checked after the first letter rather than before it, so the
+    # alternation starts with literals and the regex engine can skip ahead to candidate letters
+    first, *rest = [re.escape(word) for word in phrase.split()]
+    return first[0] + r"(?<!\w\w)(?<!\w['’]\w)" + first[1:] + "".join(_SEPARATOR + word for word in rest)
+
+
+class PhraseMatcher:
+    def __init__(self, phrases: Iterable[str]):
+        """
+        Counts occurrences of single- and multi-word phrases in text.
+
+        All phrases are compiled into one regex alternation, longest first, so counting is a
+        single C-level scan of the text however many phrases there are. Phrases match whole
+        tokens as tokenize() splits them: "so" does not match inside "also" or "so's", and the
+        words of a multi-word phrase may be separated by whitespace or punctuation, but not by an
+        apostrophe inside a word.
+
+        :param phrases: Phrases to look for, e.g. {"um", "you know"}.
+        """
+        self.phrases = sorted({" ".join(tokenize(phrase)) for phrase in phrases} - {""}, key=len, reverse=True)
+        alternation = "|".join(_phrase_pattern(phrase) for phrase in self.phrases)
+        self.pattern = re.compile(rf"(?:{alternation})(?!\w)(?!['’]\w)") if self.phrases else None
+        # Phrases first, then any other token: findall yields the phrase, or "" for a plain token
+        self._scanner = re.compile(rf"({alternation})(?!\w)(?!['’]\w)|{_TOKEN.pattern}") if self.phrases else None
+
+    def count(self, text: str) -> Counter:
+        """
+        Counts phrase occurrences in the text, case-insensitively.
+
+        Occurrences do not overlap; where phrases share words, the longest one is counted.
+
+        :param text: The text to search.
+        :return: Counter of phrase -> occurrences; phrases that never occur are absent.
+        """
+        counts = Counter()
+        if self.pattern is None:
+            return counts
+        for match, occurrences in Counter(self.pattern.findall(text.lower())).items():
+            # Multi-word matches may be separated by punctuation ("you, know"); count them as the phrase
+            counts[" ".join(_TOKEN.findall(match))] += occurrences
+        return counts
+
+    def scan(self, text: str) -> Tuple[int, Counter]:
+        """
+        Counts words and phrase occurrences in one pass over the text, case-insensitively.
+
+        Equivalent to (len(tokenize(text)), self.count(text)) without scanning the text twice.
+
+        :param text: The text to search.
+        :return: Tuple of (number of tokens, Counter of phrase -> occurrences).
+        """
+        if self._scanner is None:
+            return len(tokenize(text)), Counter()
+        found = Counter(self._scanner.findall(text.lower()))
+        words = found.pop("", 0)
+        counts = Counter()
+        for match, occurrences in found.items():
+            tokens = _TOKEN.findall(match)
+            counts[" ".join(tokens)] += occurrences
+            words += occurrences * len(tokens)
+        return words, counts
@@ -0,0 +1,53 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram("analyzer_stage_seconds", "Time spent in each analysis pipeline stage.")
+
+_profile: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("analysis_profile", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a pipeline stage into the analyzer_stage_seconds histogram.
+
+    When a profile is active for the current request (see profiled), the duration is also
+    added to that request's stage breakdown.
+
+    :param stage: Stage name, e.g. "parse", "embedding", "llm", "grammar", "textblob".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        profile = _profile.get()
+        if profile is not None:
+            profile[stage] = profile.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def profiled(enabled: bool = True):
+    """
+    Collects a per-stage timing breakdown for everything run inside the block.
+
+    Work handed to threads keeps reporting here as long as the context is copied to them
+    (pipeline.run_in_worker does this).
+
+    :param enabled: When False, nothing is collected and None is yielded.
+    :return: Dict of stage -> seconds, filled in as stages finish.
+    """
+    if not enabled:
+        yield None
+        return
+    profile: Dict[str, float] = {}
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
@@ -6,20 +6,80 @@ import { adminId, batchId } from "../utils/fixed";
 import axios from 'axios';
 import Batch from "../models/batches";
 
-const fetchAnalyses=async(transcript:string)=>{
+const ANALYZER_URL='http://localhost:8000';
+const POLL_INTERVAL_MS=2000;
+// Jobs still running after this long are polled less often; the analyzer bounds their
+// attempts and stage timeouts, so they always end up done or failed
+const SLOW_POLL_AFTER_MS=10*60*1000;
+const SLOW_POLL_INTERVAL_MS=30*1000;
+
+const sleep=(ms:number)=>new Promise(resolve=>setTimeout(resolve,ms));
+
+const submitAnalysis=async(transcript:string,candidate:string)=>{
     const batch=await Batch.findById(batchId);
     if(!batch){
         throw new AppError("Batch not found",404);
     }
     const job_description=batch.jobDescription;
 
-    const response = await axios.get('http://localhost:8000/analysis', {
-        params: {
-            transcript,
-            job_description
-        }
+    // Only queues the analysis; the analyzer answers right away with the job id
+    const submitted = await axios.post(`${ANALYZER_URL}/jobs`, {
+        transcript,
+        job_description,
+        candidate
     });
-    return response.data;
+    return submitted.data.job_id as string;
+}
+
+// Only the analyzer decides that a job failed: a slow job is never given up on while it may still finish
+const waitForAnalyses=async(jobId:string)=>{
+    const slowAfter=Date.now()+SLOW_POLL_AFTER_MS;
+    const pollInterval=()=>Date.now()<slowAfter?POLL_INTERVAL_MS:SLOW_POLL_INTERVAL_MS;
+    while(true){
+        let job;
+        try{
+            job=(await axios.get(`${ANALYZER_URL}/jobs/${jobId}`)).data;
+        }catch(error:any){
+            // The analyzer may be restarting; its jobs are persisted, so keep polling unless the job is gone
+            if(error.response?.status===404){
+                throw new AppError("Analysis job not found",502);
+            }
+            await sleep(pollInterval());
+            continue;
+        }
+        if(job.status==="done"){
+            return job.result;
+        }
+        if(job.status==="failed"){
+            throw new AppError(`Analysis failed: ${job.error}`,502);
+        }
+        await sleep(pollInterval());
+    }
+}
+
+// Runs in the background, after the candidate has been created and the request answered
+const completeAnalyses=async(candidateId:string,jobId:string)=>{
+    try{
+        const analyses=await waitForAnalyses(jobId);
+        await Candidate.findByIdAndUpdate(candidateId,{
+            analysis_status:"done",
+            experience_analysis: analyses.experience_analysis,
+            sentimental_analysis: analyses.sentimental_analysis,
+        });
+    }catch(error:any){
+        console.error(`Analysis for candidate ${candidateId} failed: ${error.message}`);
+        await Candidate.findByIdAndUpdate(candidateId,{analysis_status:"failed",analysis_error:error.message})
+            .catch((updateError:any)=>console.error(`Could not record the failure: ${updateError.message}`));
+    }
+}
+
+// Picks up analyses that were still pending when the server last stopped
+export const resumePendingAnalyses=async()=>{
+    const pending=await Candidate.find({analysis_status:"pending",analysis_job_id:{$exists:true}})
+        .select("_id analysis_job_id");
+    for(const candidate of pending){
+        completeAnalyses(candidate._id.toString(),candidate.analysis_job_id as string);
+    }
 }
 
 export const createCandidate=async(req:Request,res:Response,next:NextFunction)=>{
@@ -37,18 +97,18 @@ export const createCandidate=async(req:Request,res:Response,next:NextFunction)=>
             return next(new AppError("Admin not found",404));
         }
 
-        const analyses=await fetchAnalyses(transcript);
+        const jobId=await submitAnalysis(transcript,userName);
         
         const newCandidate= await Candidate.create({
             name:batch,
             batch:batch,
             transcript,
-            experience_analysis: analyses.experience_analysis,
-            sentimental_analysis: analyses.sentimental_analysis,
+            analysis_status:"pending",
+            analysis_job_id:jobId,
             // admin:tempAdminId
         });
 
-        newCandidate.save();
+        completeAnalyses(newCandidate._id.toString(),jobId);
         return res.status(201).json(newCandidate);
     }catch(error:any){
         res.status(500).json({error:error.message});
@@ -102,7 +162,9 @@ export const getCandidateAnalytics=async(req:Request,res:Response,next:NextFunct
         experience_analysis:candidate.experience_analysis,
         sentimental_analysis:candidate.sentimental_analysis,
         name:candidate.name,
-        transcript:candidate.transcript
+        transcript:candidate.transcript,
+        analysis_status:candidate.analysis_status,
+        analysis_error:candidate.analysis_error
     }
 
     res.status(200).json(data);
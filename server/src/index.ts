@@ -9,6 +9,7 @@ import v1Routes from "./routes/v1/index";
 import errorHandlerMiddleware from "./middlewares/errorHandler";
 import notFoundMiddleware from "./middlewares/notFound";
 import cookieParser from "cookie-parser";
+import { resumePendingAnalyses } from "./controllers/candidate.controller";
 
 dotenv.config();
 
@@ -59,4 +60,9 @@ const PORT =
     ? Number(args[portArgIndex + 1])
     : Number(process.env.PORT) || 5000;
 
-app.listen(PORT, () => console.log(`Server running on port ${PORT}`));
+app.listen(PORT, () => {
+  console.log(`Server running on port ${PORT}`);
+  resumePendingAnalyses().catch((error) =>
+    console.error(`Could not resume pending analyses: ${error.message}`)
+  );
+});
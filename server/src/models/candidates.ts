@@ -15,6 +15,18 @@ const candidatesSchema = new mongoose.Schema(
       type: String,
       required: true,
     },
+    // Analyses are filled in by a background poller once the analyzer job finishes
+    analysis_status: {
+      type: String,
+      enum: ["pending", "done", "failed"],
+      default: "pending",
+    },
+    analysis_job_id: {
+      type: String,
+    },
+    analysis_error: {
+      type: String,
+    },
     experience_analysis: {
       experience_match: {
         type: Number,